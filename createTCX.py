@@ -1,8 +1,8 @@
 import numpy as np
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
 from datetime import datetime, timedelta
-import random
+from tcxgen.geodesy import arc, arc_center
+from tcxgen.track import cumulative_distance
+from tcxgen.tcxwriter import TCXWriter
 
 def interpolate_line(start, end, num_points):
     lats = np.linspace(start[0], end[0], num_points)
@@ -10,27 +10,18 @@ def interpolate_line(start, end, num_points):
     alts = np.linspace(start[2], end[2], num_points)
     return list(zip(lats, lons, alts))
 
-def interpolate_arc(center, radius, start_angle, end_angle, num_points):
-    angles = np.linspace(start_angle, end_angle, num_points)
-    lats = center[0] + radius * np.sin(np.radians(angles))
-    lons = center[1] + radius * np.cos(np.radians(angles))
-    alts = np.linspace(center[2], center[2] + 1, num_points)  # 高度变化
+def interpolate_arc(start, end, sweep, num_points):
+    # 从 start 到 end、转过 sweep 度的圆弧，圆心和半径由两个端点推出，首尾与相邻的直线相接
+    lats, lons = arc(*arc_center(start[0], start[1], end[0], end[1], sweep), num_points)
+    alts = np.linspace(start[2], start[2] + 1, num_points)  # 高度变化
     return list(zip(lats, lons, alts))
 
-def haversine(coord1, coord2):
-    R = 6371000  # 地球半径，单位为米
-    lat1, lon1 = np.radians(coord1[:2])  # 只传递纬度和经度
-    lat2, lon2 = np.radians(coord2[:2])  # 只传递纬度和经度
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
-    return R * c
+rng = np.random.default_rng(20240501)  # 固定种子，每次运行结果相同
 
 def add_random_offset(lat, lon, alt, max_offset=0.00001):
-    lat += random.uniform(-max_offset, max_offset)
-    lon += random.uniform(-max_offset, max_offset)
-    alt += random.uniform(-0.5, 0.5)
+    lat += rng.uniform(-max_offset, max_offset)
+    lon += rng.uniform(-max_offset, max_offset)
+    alt += rng.uniform(-0.5, 0.5)
     return lat, lon, alt
 
 def generate_trackpoints(num_points):
@@ -41,83 +32,39 @@ def generate_trackpoints(num_points):
         'top': (39.086250, 121.808194, 99.0)
     }
     
+    # 逆时针一圈：两条直线之间各接一个向外凸的半圆
     left_to_bottom = interpolate_line(points['left'], points['bottom'], num_points // 4)
-    bottom_to_right = interpolate_arc((points['bottom'][0], (points['bottom'][1] + points['right'][1]) / 2, points['bottom'][2]), 
-                                      haversine(points['bottom'], points['right']) / 2, 270, 360, num_points // 4)
+    bottom_to_right = interpolate_arc(points['bottom'], points['right'], 180, num_points // 4)
     right_to_top = interpolate_line(points['right'], points['top'], num_points // 4)
-    top_to_left = interpolate_arc((points['top'][0], (points['top'][1] + points['left'][1]) / 2, points['top'][2]), 
-                                  haversine(points['top'], points['left']) / 2, 90, 180, num_points // 4)
+    top_to_left = interpolate_arc(points['top'], points['left'], 180, num_points // 4)
     
     trackpoints = left_to_bottom + bottom_to_right + right_to_top + top_to_left
     trackpoints = [add_random_offset(lat, lon, alt) for lat, lon, alt in trackpoints]
     return trackpoints
 
-def create_tcx():
-    root = ET.Element("TrainingCenterDatabase", 
-                      {"xmlns": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2", 
-                       "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance", 
-                       "xsi:schemaLocation": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2 http://www.garmin.com/xmlschemas/TrainingCenterDatabasev2.xsd"})
-    
-    activities = ET.SubElement(root, "Activities")
-    activity = ET.SubElement(activities, "Activity", {"Sport": "Running"})
-    
-    id = ET.SubElement(activity, "Id")
-    id.text = "2024-05-01T10:03:32Z"
-    
-    lap = ET.SubElement(activity, "Lap", {"StartTime": "2024-05-01T10:03:32Z"})
-    
-    total_time = ET.SubElement(lap, "TotalTimeSeconds")
-    total_time.text = "1579"
-    
-    distance = ET.SubElement(lap, "DistanceMeters")
-    distance.text = "3020"
-    
-    calories = ET.SubElement(lap, "Calories")
-    calories.text = "288"
-    
-    avg_pace = ET.SubElement(lap, "Extensions")
-    tpx = ET.SubElement(avg_pace, "TPX", {"xmlns": "http://www.garmin.com/xmlschemas/ActivityExtension/v2"})
-    speed = ET.SubElement(tpx, "Speed")
-    speed.text = str(3020 / 1579)
-    
-    intensity = ET.SubElement(lap, "Intensity")
-    intensity.text = "Active"
-    
-    trigger_method = ET.SubElement(lap, "TriggerMethod")
-    trigger_method.text = "Manual"
-    
-    track = ET.SubElement(lap, "Track")
-    
+def create_tcx(path="/Users/Herython/Desktop/Test/running/5_1.tcx"):
     start_time = datetime.strptime("2024-05-01T10:03:32Z", "%Y-%m-%dT%H:%M:%SZ")
-    
+
     num_points_per_circle = int((1579 / 7.55) / 2.056)
     trackpoints = generate_trackpoints(num_points_per_circle)
-    
-    total_distance = 0.0
-    for i, (lat, lon, alt) in enumerate(trackpoints[:int(1579 / 2.056)]):
-        trackpoint = ET.SubElement(track, "Trackpoint")
-        
-        t = ET.SubElement(trackpoint, "Time")
-        t.text = (start_time + timedelta(seconds=i * 2.056)).strftime("%Y-%m-%dT%H:%M:%SZ")
-        
-        position = ET.SubElement(trackpoint, "Position")
-        
-        latitude = ET.SubElement(position, "LatitudeDegrees")
-        latitude.text = str(lat)
-        
-        longitude = ET.SubElement(position, "LongitudeDegrees")
-        longitude.text = str(lon)
-        
-        altitude = ET.SubElement(trackpoint, "AltitudeMeters")
-        altitude.text = str(alt)
-        
-        distance = ET.SubElement(trackpoint, "DistanceMeters")
-        total_distance += 3.02 / len(trackpoints) * 400
-        distance.text = str(total_distance)  # 简单线性插值距离
-    
-    # Pretty print
-    xmlstr = minidom.parseString(ET.tostring(root)).toprettyxml(indent="   ")
-    with open("/Users/Herython/Desktop/Test/running/5_1.tcx", "w") as f:
-        f.write(xmlstr)
 
-create_tcx()
+    trackpoints = trackpoints[:int(1579 / 2.056)]
+    lat, lon, alt = (np.array(c) for c in zip(*trackpoints))
+    distance = cumulative_distance(lat, lon)
+    # 圈的用时和距离取自轨迹本身，与轨迹点一致
+    total_time = (len(trackpoints) - 1) * 2.056
+
+    with open(path, "w") as f:
+        writer = TCXWriter(f, indent="   ")
+        writer.start_activity("2024-05-01T10:03:32Z")
+        writer.start_lap("2024-05-01T10:03:32Z", total_time, distance[-1], int(distance[-1] * 0.1),
+                         distance[-1] / total_time)
+
+        for i in range(len(trackpoints)):
+            writer.trackpoint(start_time + timedelta(seconds=i * 2.056), lat[i], lon[i], alt[i], distance[i])
+
+        writer.end_lap()
+        writer.end_activity()
+
+if __name__ == "__main__":
+    create_tcx()
@@ -1,7 +1,6 @@
 import numpy as np
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
 from datetime import datetime, timedelta
+from tcxgen.tcxwriter import TCXWriter
 
 def interpolate_points(points, num_intervals):
     latitudes = [point[0] for point in points]
@@ -39,67 +38,19 @@ total_points = total_points[:int(1579 / 2.056)]
 
 
 
-def create_tcx():
-    root = ET.Element("TrainingCenterDatabase", 
-                      {"xmlns": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2", 
-                       "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance", 
-                       "xsi:schemaLocation": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2 http://www.garmin.com/xmlschemas/TrainingCenterDatabasev2.xsd"})
-    
-    activities = ET.SubElement(root, "Activities")
-    activity = ET.SubElement(activities, "Activity", {"Sport": "Running"})
-    
-    id = ET.SubElement(activity, "Id")
-    id.text = "2024-05-01T10:03:32Z"
-    
-    lap = ET.SubElement(activity, "Lap", {"StartTime": "2024-05-01T10:03:32Z"})
-    
-    total_time = ET.SubElement(lap, "TotalTimeSeconds")
-    total_time.text = "1579"
-    
-    distance = ET.SubElement(lap, "DistanceMeters")
-    distance.text = "3020"
-    
-    calories = ET.SubElement(lap, "Calories")
-    calories.text = "288"
-    
-    avg_pace = ET.SubElement(lap, "Extensions")
-    tpx = ET.SubElement(avg_pace, "TPX", {"xmlns": "http://www.garmin.com/xmlschemas/ActivityExtension/v2"})
-    speed = ET.SubElement(tpx, "Speed")
-    speed.text = str(3020 / 1579)
-    
-    intensity = ET.SubElement(lap, "Intensity")
-    intensity.text = "Active"
-    
-    trigger_method = ET.SubElement(lap, "TriggerMethod")
-    trigger_method.text = "Manual"
-    
-    track = ET.SubElement(lap, "Track")
-    
+def create_tcx(path="/Users/Herython/Desktop/Test/running/5_1_1.tcx"):
     start_time = datetime.strptime("2024-05-01T10:03:32Z", "%Y-%m-%dT%H:%M:%SZ")
-    
-    for i, (lat, lon, alt) in enumerate(total_points):
-        trackpoint = ET.SubElement(track, "Trackpoint")
-        
-        t = ET.SubElement(trackpoint, "Time")
-        t.text = (start_time + timedelta(seconds=i * 2.056)).strftime("%Y-%m-%dT%H:%M:%SZ")
-        
-        position = ET.SubElement(trackpoint, "Position")
-        
-        latitude = ET.SubElement(position, "LatitudeDegrees")
-        latitude.text = str(lat)
-        
-        longitude = ET.SubElement(position, "LongitudeDegrees")
-        longitude.text = str(lon)
-        
-        altitude = ET.SubElement(trackpoint, "AltitudeMeters")
-        altitude.text = str(alt)
-        
-        distance = ET.SubElement(trackpoint, "DistanceMeters")
-        distance.text = str(i * 3.02) # 简单线性插值距离
-    
-    # Pretty print
-    xmlstr = minidom.parseString(ET.tostring(root)).toprettyxml(indent="   ")
-    with open("/Users/Herython/Desktop/Test/running/5_1_1.tcx", "w") as f:
-        f.write(xmlstr)
 
-create_tcx()
+    with open(path, "w") as f:
+        writer = TCXWriter(f, indent="   ")
+        writer.start_activity("2024-05-01T10:03:32Z")
+        writer.start_lap("2024-05-01T10:03:32Z", "1579", "3020", "288", 3020 / 1579)
+
+        for i, (lat, lon, alt) in enumerate(total_points):
+            writer.trackpoint(start_time + timedelta(seconds=i * 2.056), lat, lon, alt, i * 3.02) # 简单线性插值距离
+
+        writer.end_lap()
+        writer.end_activity()
+
+if __name__ == "__main__":
+    create_tcx()
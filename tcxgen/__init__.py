@@ -0,0 +1,12 @@
+# 导入本包没有任何副作用：numpy 等依赖由各子模块在用到时才导入
+__version__ = "0.1.0"
+
+# 进程内生成接口，首次访问时才加载 tcxgen.api
+_API = ("render", "render_to", "arender", "astream")
+
+
+def __getattr__(name):
+    if name in _API:
+        from . import api
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,120 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from .batch import build_track
+from .metrics import NULL_METRICS
+from .sinks import SINKS
+
+
+def _seed_sequence(seed):
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def render_to(f, start_time, total_distance, total_time, seed=None, output_format="tcx", metrics=None, **options):
+    """把一个活动写入以二进制方式打开的文件对象，返回写入的点数。
+
+    seed 可以是整数或 SeedSequence；options 与 batch 的生成选项相同（route、interval、sensors 等）；
+    metrics 为 tcxgen.metrics.Metrics 时记录各阶段用时。
+    """
+    track, laps = build_track(start_time, total_distance, total_time, _seed_sequence(seed), metrics=metrics,
+                              **options)
+    with (metrics or NULL_METRICS).stage("serialize"):
+        points = SINKS[output_format][1](f, track, start_time, total_distance, total_time, laps=laps)
+    if metrics is not None:
+        metrics.count("points", points)
+    return points
+
+
+def render(start_time, total_distance, total_time, seed=None, output_format="tcx", **options):
+    """生成一个活动，以 bytes 返回，不经过磁盘。"""
+    buffer = io.BytesIO()
+    render_to(buffer, start_time, total_distance, total_time, seed, output_format, **options)
+    return buffer.getvalue()
+
+
+async def arender(start_time, total_distance, total_time, seed=None, output_format="tcx", executor=None,
+                  **options):
+    """render 的 asyncio 版本，生成放到 executor 里进行，不阻塞事件循环。"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(render, start_time, total_distance, total_time, seed,
+                                                        output_format, **options))
+
+
+class _QueueWriter(io.RawIOBase):
+    """供工作线程写入的文件对象，攒够 chunk_size 字节后交给事件循环里的队列。"""
+
+    def __init__(self, queue, loop, chunk_size):
+        super().__init__()
+        self.queue = queue
+        self.loop = loop
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.cancelled = False
+
+    def put(self, item):
+        # 队列满时阻塞工作线程，生成速度不会超过读取速度
+        asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop).result()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.cancelled:
+            raise RuntimeError("读取端已关闭")
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+
+def _render_to_writer(writer, *args, **options):
+    try:
+        render_to(writer, *args, **options)
+        if writer.buffer:
+            writer.put(bytes(writer.buffer))
+    finally:
+        # None 表示结束，出错时也要发出，读取端才不会一直等待
+        writer.put(None)
+
+
+async def astream(start_time, total_distance, total_time, seed=None, output_format="tcx", executor=None,
+                  chunk_size=65536, **options):
+    """异步生成器，边生成边交出序列化后的字节块，适合直接作为 HTTP 请求体上传。
+
+    executor 为线程池（默认）时在工作线程里边写边交出，内存里最多只有几块；
+    进程池无法共享队列，在子进程里整份生成后再分块交出。
+    """
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        data = await arender(start_time, total_distance, total_time, seed, output_format, executor, **options)
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+        return
+
+    queue = asyncio.Queue(maxsize=4)
+    writer = _QueueWriter(queue, loop, chunk_size)
+    future = loop.run_in_executor(executor, partial(_render_to_writer, writer, start_time, total_distance,
+                                                    total_time, seed, output_format, **options))
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            yield chunk
+        # 把生成过程中的异常抛给调用方
+        await future
+    finally:
+        if not future.done():
+            # 读取端提前退出：让工作线程在下一次写入时停下，并清空队列放行它阻塞中的写入
+            writer.cancelled = True
+            while not future.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+            # 工作线程因读取端关闭而抛出的异常不再需要
+            future.exception()
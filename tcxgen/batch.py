@@ -0,0 +1,329 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .elevation import open_dem
+from .laps import LapAggregator
+from .metrics import NULL_METRICS, Metrics
+from .route import load_route
+from .signals import PositionNoise, SensorModel
+from .track import DEFAULT_ROUTE, Track, route_template, track_chunks
+from .sinks import SINKS, atomic_open, write_file
+
+# 相同输入的输出发生变化时递增，记录在 manifest 里，也是增量索引键的一部分
+GENERATOR_VERSION = "3"
+# 未指定 --interval 时的采样间隔（秒），沿用最初脚本的取值
+DEFAULT_INTERVAL = 2.056
+INDEX_FILE = ".index.json"
+
+
+def random_activity(date, rng, utc_offset=8, earliest=(17, 0), latest=(20, 12), distance=(3020, 3230),
+                    duration=(25*60, 30*60)):
+    # 默认取值范围：傍晚 17:00~20:12 开跑，3020~3230 米，25~30 分钟（本地时间）
+    start_hour = int(rng.integers(earliest[0], latest[0] + 1))
+    first_minute = earliest[1] if start_hour == earliest[0] else 0
+    last_minute = latest[1] if start_hour == latest[0] else 59
+    start_minute = int(rng.integers(first_minute, last_minute + 1))
+    start_second = int(rng.integers(0, 60))
+    local_time = datetime(date.year, date.month, date.day, start_hour, start_minute, start_second)
+    start_time = local_time - timedelta(hours=utc_offset)  # 转换为UTC时间
+
+    total_distance = rng.uniform(*distance)
+    total_time = rng.uniform(*duration)
+    return start_time, total_distance, total_time
+
+
+def activity_seed(entropy, index):
+    # 与 SeedSequence(entropy).spawn(n)[index] 相同，但可以单独算出任意一个活动的种子
+    return np.random.SeedSequence(entropy, spawn_key=(index,))
+
+
+# 由活动的 SeedSequence 派生的随机流编号，活动种子本身不会再 spawn，编号不会冲突
+SENSOR_STREAM = 0
+
+
+def child_seed(seed_seq, key):
+    # 与 seed_seq.spawn() 得到的第 key 个子种子相同，但不改变 seed_seq：同一个 SeedSequence 反复使用结果不变
+    return np.random.SeedSequence(seed_seq.entropy, spawn_key=seed_seq.spawn_key + (key,),
+                                  pool_size=seed_seq.pool_size)
+
+
+def date_range_tasks(start_date, days, seed=None, utc_offset=8, **ranges):
+    # 每个活动一个独立的 SeedSequence，结果与 worker 数量和执行顺序无关；ranges 传给 random_activity
+    entropy = np.random.SeedSequence(seed).entropy
+    tasks = []
+    for i in range(days):
+        param_seq, track_seq = activity_seed(entropy, i).spawn(2)
+        date = start_date + timedelta(days=i)
+        start_time, total_distance, total_time = random_activity(date, np.random.default_rng(param_seq), utc_offset,
+                                                                 **ranges)
+        tasks.append((i, date, start_time, total_distance, total_time, track_seq))
+    return tasks, entropy
+
+
+def manifest_tasks(path, seed=None, utc_offset=8):
+    # 清单为 CSV：date,start_time,distance,duration（本地日期和时间，米，秒）；
+    # 带有 index / seed / spawn_key 列时（例如本程序写出的 manifest.csv）按原种子重新生成
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    entropy = np.random.SeedSequence(seed).entropy
+    tasks = []
+    for i, row in enumerate(rows):
+        date = datetime.strptime(row["date"], "%Y-%m-%d")
+        clock = datetime.strptime(row["start_time"], "%H:%M:%S")
+        local_time = date.replace(hour=clock.hour, minute=clock.minute, second=clock.second)
+        start_time = local_time - timedelta(hours=utc_offset)
+        if row.get("seed"):
+            index = int(row["index"])
+            seq = np.random.SeedSequence(int(row["seed"]), spawn_key=tuple(int(k) for k in row["spawn_key"].split(".")))
+        else:
+            index, seq = i, activity_seed(entropy, i)
+        tasks.append((index, date, start_time, float(row["distance"]), float(row["duration"]), seq))
+    return tasks, entropy
+
+
+def build_track(start_time, total_distance, total_time, seed_seq, route=None, cache_dir=None, interval=None,
+                lap_distance=None, lap_per_loop=False, sensors=False, dem_dir=None, metrics=None):
+    # 返回 (轨迹, 分圈器)；轨迹是一个 Track 或按块生成的 Track 序列，分圈器可能为 None。
+    # 按块生成时各阶段在写入时才真正执行，metrics 的计时也随之发生在写入过程中
+    if lap_distance and lap_per_loop:
+        raise ValueError("lap_distance 和 lap_per_loop 只能指定一个")
+    metrics = metrics or NULL_METRICS
+    rng = np.random.default_rng(seed_seq)
+    laps = None
+    # 路线按需要循环，正好停在目标用时或距离上；导入的路线顶点疏密不一，按弧长取位置。
+    # 轨迹按块边生成边写入
+    route = DEFAULT_ROUTE if route is None else route
+    interval = interval or DEFAULT_INTERVAL
+    # 各阶段：distance 为时间轴和累计距离，interpolate 为按距离取位置，jitter 为 GPS 噪声
+    track = metrics.timed("distance", track_chunks(route, start_time, total_time, total_distance, interval=interval,
+                                                   cache_dir=cache_dir, metrics=metrics))
+    track = _apply(PositionNoise(rng, interval).apply, track, metrics, "jitter")
+    if lap_per_loop:
+        laps = LapAggregator(distance=route_template(route, len(route), cache_dir).lap_length, trigger="Location")
+    if lap_distance:
+        laps = LapAggregator(distance=lap_distance)
+    if dem_dir is not None:
+        track = _apply(open_dem(dem_dir).apply, track, metrics, "dem")
+    if sensors:
+        # 传感器噪声用单独的随机流，开关它不影响轨迹本身
+        sensor_rng = np.random.default_rng(child_seed(seed_seq, SENSOR_STREAM))
+        track = _apply(SensorModel(sensor_rng, interval).apply, track, metrics, "sensors")
+    return track, laps
+
+
+def _apply(func, track, metrics, name):
+    # 对整条轨迹或逐块调用 func，用时记到 name 阶段
+    if isinstance(track, Track):
+        with metrics.stage(name):
+            return func(track)
+    return (_timed_call(func, chunk, metrics, name) for chunk in track)
+
+
+def _timed_call(func, chunk, metrics, name):
+    with metrics.stage(name):
+        return func(chunk)
+
+
+def generate_activity(filename, start_time, total_distance, total_time, seed_seq, output_format="tcx",
+                      metrics=None, **options):
+    # filename 不含扩展名；options 传给 build_track；返回写入的点数
+    track, laps = build_track(start_time, total_distance, total_time, seed_seq, metrics=metrics, **options)
+    path = filename + SINKS[output_format][0]
+    if metrics is None:
+        return write_file(path, output_format, track, start_time, total_distance, total_time, laps=laps)
+
+    # serialize 只记自身用时，按块生成时穿插其中的生成、DEM、传感器时间和写入磁盘的时间记在各自阶段
+    points = write_file(path, output_format, track, start_time, total_distance, total_time, laps=laps,
+                        metrics=metrics)
+    metrics.count("files")
+    metrics.count("points", points)
+    metrics.count("bytes", os.path.getsize(path))
+    return points
+
+
+def _generate_measured(*args, **options):
+    # 在子进程里统计，连同点数一起交回主进程合并
+    metrics = Metrics()
+    points = generate_activity(*args, metrics=metrics, **options)
+    return points, metrics.as_dict()
+
+
+class _InlineExecutor:
+    """workers=0 时在当前进程里顺序执行，cProfile 才能看到生成过程。"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def write_manifest(directory, tasks, name_format, options, settings):
+    # 记录每个活动的参数和种子，任何一个文件都可以单独重新生成
+    utc_offset = settings.get("utc_offset", 8)
+    extension = SINKS[options.get("output_format", "tcx")][0]
+    activities = []
+    for index, date, start_time, total_distance, total_time, seed_seq in tasks:
+        activities.append({
+            "index": index,
+            "date": date.strftime("%Y-%m-%d"),
+            "start_time": (start_time + timedelta(hours=utc_offset)).strftime("%H:%M:%S"),
+            "distance": total_distance,
+            "duration": total_time,
+            "seed": seed_seq.entropy,
+            "spawn_key": ".".join(str(k) for k in seed_seq.spawn_key),
+            "file": name_format.format(index=index, date=date) + extension,
+        })
+
+    manifest = {"generator_version": GENERATOR_VERSION, "name_format": name_format,
+                "options": {k: v for k, v in options.items() if k != "route"}, **settings,
+                "activities": activities}
+    with atomic_open(os.path.join(directory, "manifest.json")) as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    with atomic_open(os.path.join(directory, "manifest.csv")) as f:
+        writer = csv.DictWriter(f, fieldnames=list(activities[0]) if activities else ["index"])
+        writer.writeheader()
+        writer.writerows(activities)
+
+
+def load_run(path, only=None):
+    # 读取 manifest.json，返回可直接交给 run_batch 的任务和设置
+    with open(path) as f:
+        manifest = json.load(f)
+    utc_offset = manifest.get("utc_offset", 8)
+    tasks = []
+    for activity in manifest["activities"]:
+        if only is not None and activity["index"] not in only:
+            continue
+        date = datetime.strptime(activity["date"], "%Y-%m-%d")
+        clock = datetime.strptime(activity["start_time"], "%H:%M:%S")
+        start_time = date.replace(hour=clock.hour, minute=clock.minute, second=clock.second) - timedelta(hours=utc_offset)
+        seq = np.random.SeedSequence(activity["seed"], spawn_key=tuple(int(k) for k in activity["spawn_key"].split(".")))
+        tasks.append((activity["index"], date, start_time, activity["distance"], activity["duration"], seq))
+
+    options = dict(manifest["options"])
+    if manifest.get("route_file"):
+        options["route"] = [tuple(p) for p in load_route(manifest["route_file"], manifest.get("simplify")).tolist()]
+    settings = {k: manifest.get(k) for k in ("seed", "utc_offset", "route_file", "simplify")}
+    return tasks, manifest["name_format"], options, settings
+
+
+def activity_key(task, options, route_digest=None):
+    # 决定输出内容的全部输入：生成器版本、路线、选项、活动参数和种子。
+    # cache_dir 只影响速度不计入；dem_dir 只按路径计入，瓦片内容变了需要 --force
+    _, _, start_time, total_distance, total_time, seed_seq = task
+    payload = {
+        "generator_version": GENERATOR_VERSION,
+        "route": route_digest,
+        "options": {k: v for k, v in sorted(options.items()) if k not in ("route", "cache_dir")},
+        "start_time": start_time.isoformat(),
+        "distance": repr(float(total_distance)),
+        "duration": repr(float(total_time)),
+        "seed": str(seed_seq.entropy),
+        "spawn_key": list(seed_seq.spawn_key),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def load_index(directory):
+    # 索引：内容键 -> 输出文件名（相对输出目录）
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_index(directory, index):
+    with atomic_open(os.path.join(directory, INDEX_FILE)) as f:
+        json.dump(index, f, indent=0, sort_keys=True)
+
+
+def run_batch(tasks, directory, workers=None, name_format="{date.month}_{date.day}", report_every=None,
+              settings=None, incremental=False, metrics=None, **options):
+    # options 原样传给 generate_activity；给出 settings 时写出 manifest.json / manifest.csv。
+    # incremental 时跳过索引里键相同且文件仍在的活动，只重新生成缺失或过期的。
+    # workers=0 时在当前进程里顺序执行；给出 metrics 时各活动的分阶段统计合并到其中
+    os.makedirs(directory, exist_ok=True)
+    if settings is not None:
+        write_manifest(directory, tasks, name_format, options, settings)
+
+    extension = SINKS[options.get("output_format", "tcx")][0]
+    route = options.get("route")
+    route_digest = hashlib.sha256(np.asarray(route, dtype=np.float64).tobytes()).hexdigest() if route else None
+    built = load_index(directory)
+    # 反查表：文件名 -> 当前的键，记录一个文件时不用扫描整个索引
+    names = {name: key for key, name in built.items()}
+    pending, skipped = [], 0
+    for task in tasks:
+        stem = name_format.format(index=task[0], date=task[1])
+        key = activity_key(task, options, route_digest)
+        if incremental and built.get(key) == stem + extension and os.path.exists(os.path.join(directory, stem + extension)):
+            skipped += 1
+        else:
+            pending.append((task, stem, key))
+    if skipped:
+        print(f"{skipped} files up to date")
+    if report_every is None:
+        report_every = max(1, len(pending) // 20)
+
+    started = time.perf_counter()
+    files = points = 0
+
+    def report():
+        elapsed = time.perf_counter() - started
+        print(f"{files}/{len(pending)} files, {files / elapsed:.1f} files/s, {points / elapsed:.0f} points/s")
+
+    def record(name, key):
+        # 同一个文件之前对应的旧键作废；这个键之前对应的别的文件也不再指向它
+        old = names.get(name)
+        if old is not None and old != key:
+            del built[old]
+        previous = built.get(key)
+        if previous is not None and previous != name:
+            del names[previous]
+        built[key] = name
+        names[name] = key
+
+    executor = _InlineExecutor() if workers == 0 else ProcessPoolExecutor(max_workers=workers)
+    generate = generate_activity if metrics is None else _generate_measured
+    futures, recorded = {}, set()
+    try:
+        for (_, _, start_time, total_distance, total_time, seed_seq), stem, key in pending:
+            future = executor.submit(generate, os.path.join(directory, stem), start_time,
+                                     total_distance, total_time, seed_seq, **options)
+            futures[future] = (stem + extension, key)
+        for future in as_completed(futures):
+            result = future.result()
+            if metrics is not None:
+                result, measured = result
+                metrics.merge(measured)
+            points += result
+            record(*futures[future])
+            recorded.add(future)
+            files += 1
+            if files % report_every == 0 or files == len(pending):
+                report()
+                save_index(directory, built)
+    finally:
+        # 中途失败或被打断时取消排队的任务，已经写完但还没记下的文件也记入索引，下次只补剩下的
+        executor.shutdown(cancel_futures=True)
+        for future, (name, key) in futures.items():
+            if (future not in recorded and future.done() and not future.cancelled()
+                    and future.exception() is None):
+                record(name, key)
+        save_index(directory, built)
+
+    return files, points, time.perf_counter() - started
@@ -0,0 +1,91 @@
+import csv
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from .batch import DEFAULT_INTERVAL, generate_activity
+from .metrics import Metrics
+
+# 与 batch --metrics 的阶段一致：时间轴与累计距离、按距离在路线上插值、GPS 噪声、DEM 海拔、传感器、格式化、写入磁盘
+STAGES = ["distance", "interpolate", "jitter", "dem", "sensors", "serialize", "write"]
+SPEED = 3.0  # 米/秒，只决定总距离，不影响点数
+
+
+def peak_rss_kb():
+    # Linux 下 ru_maxrss 单位为 KB，macOS 下为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if os.uname().sysname == "Darwin" else rss
+
+
+def bench_once(n, directory, interval=None, output_format="tcx", sensors=False, dem_dir=None, seed=0, trace=False):
+    # 走与 batch 相同的路径：按块生成 -> 传感器 -> 序列化 -> 原子写入磁盘，各阶段用时取自 Metrics。
+    # interval 为 None 时与不带 --interval 的 batch（formalBetter.py）相同
+    metrics = Metrics()
+    start_time = datetime(2024, 5, 1, 10, 3, 32)
+    total_time = n * (interval or DEFAULT_INTERVAL)
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    points = generate_activity(os.path.join(directory, f"bench_{n}"), start_time, SPEED * total_time, total_time,
+                               np.random.SeedSequence(seed), output_format=output_format, metrics=metrics,
+                               interval=interval, sensors=sensors, dem_dir=dem_dir)
+    total = time.perf_counter() - started
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+
+    result = {"interval": interval or DEFAULT_INTERVAL, "points": points, "bytes": metrics.counts["bytes"],
+              "tracemalloc_peak_kb": peak}
+    for name in STAGES:
+        result[f"{name}_s"] = metrics.times.get(name, 0.0)
+    result["total_s"] = total
+    return result
+
+
+def bench_size(n, repeat=3, **options):
+    # 在单独的进程里跑一个规模，peak_rss_kb 只反映这个规模。
+    # 每个规模取最快的一次，减少抖动；tracemalloc 会拖慢计时，也会多占内存，放在读取 RSS 之后单独再跑一次
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [bench_once(n, directory, seed=i, **options) for i in range(repeat)]
+        best = min(runs, key=lambda r: r["total_s"])
+        best["peak_rss_kb"] = peak_rss_kb()
+        best["tracemalloc_peak_kb"] = bench_once(n, directory, trace=True, **options)["tracemalloc_peak_kb"]
+    return best
+
+
+def run(sizes, repeat=3, intervals=(None, 1.0), **options):
+    # intervals 中的 None 表示默认采样间隔（formalBetter.py 的路径）；options 为 output_format、sensors、dem_dir
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for interval in intervals:
+        for n in sizes:
+            # spawn 出的新进程不继承父进程的内存占用
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                best = executor.submit(bench_size, n, repeat, interval=interval, **options).result()
+            results.append(best)
+            stages = "  ".join(f"{name} {best[name + '_s'] * 1000:.1f}" for name in STAGES if best[name + "_s"])
+            print(f"{best['interval']:>6.3f} s {n:>8} points  total {best['total_s'] * 1000:9.1f} ms  "
+                  f"{best['points'] / best['total_s']:12.0f} points/s  "
+                  f"rss {best['peak_rss_kb']} KB  traced {best['tracemalloc_peak_kb']} KB")
+            print(f"{'':>17}{stages} (ms)")
+    return results
+
+
+def save(results, json_path=None, csv_path=None):
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"), "results": results}, f, indent=2)
+    if csv_path:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
@@ -0,0 +1,254 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+
+# 与 sinks.SINKS 的键一致；这里不导入 sinks，避免 --help 之类的命令也加载 numpy
+FORMATS = ["tcx", "tcx.gz", "fit"]
+
+
+def _clock(text):
+    # "HH:MM" -> (时, 分)
+    hour, minute = text.split(":")[:2]
+    return int(hour), int(minute)
+
+
+def _ranges(args):
+    return {"earliest": _clock(args.earliest), "latest": _clock(args.latest),
+            "distance": tuple(args.distance_range), "duration": tuple(args.duration_range)}
+
+
+def _load_route(args):
+    if not args.route:
+        return None
+    from .route import load_route
+    return [tuple(p) for p in load_route(args.route, args.simplify).tolist()]
+
+
+def _options(args):
+    # 传给 generate_activity 的生成选项
+    return {"route": _load_route(args), "cache_dir": args.route_cache, "output_format": args.format,
+            "interval": args.interval, "lap_distance": args.lap_distance, "lap_per_loop": args.lap_per_loop,
+            "sensors": args.sensors, "dem_dir": args.dem}
+
+
+def cmd_generate(parser, args):
+    import numpy as np
+    from .batch import activity_seed, generate_activity, random_activity
+    from .sinks import SINKS
+
+    if not args.date or not args.out:
+        parser.error("需要指定 --date 和 --out")
+
+    # 种子和序号的用法与 batch 相同，同一 --seed 下 --index i 得到的参数与 batch 的第 i 个活动一致
+    date = datetime.strptime(args.date, "%Y-%m-%d")
+    param_seq, track_seq = activity_seed(np.random.SeedSequence(args.seed).entropy, args.index).spawn(2)
+    start_time, total_distance, total_time = random_activity(date, np.random.default_rng(param_seq),
+                                                             args.utc_offset, **_ranges(args))
+    if args.start_time:
+        clock = datetime.strptime(args.start_time, "%H:%M:%S")
+        local_time = date.replace(hour=clock.hour, minute=clock.minute, second=clock.second)
+        start_time = local_time - timedelta(hours=args.utc_offset)
+    total_distance = args.distance or total_distance
+    total_time = args.duration or total_time
+
+    extension = SINKS[args.format][0]
+    stem = args.out[:-len(extension)] if args.out.endswith(extension) else args.out
+    points = generate_activity(stem, start_time, total_distance, total_time, track_seq, **_options(args))
+    print(f"{stem + extension}: {points} points")
+
+
+def cmd_batch(parser, args):
+    sources = [name for name in ("start", "manifest", "replay") if getattr(args, name)]
+    if len(sources) != 1:
+        parser.error("--start、--manifest、--replay 需要且只能指定一个")
+    if not args.out and not args.replay:
+        parser.error("需要指定 --out")
+
+    metrics = None
+    if args.metrics:
+        from .metrics import Metrics
+        metrics = Metrics()
+    if args.profile:
+        # cProfile 只能统计当前进程，所以不用进程池
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.runcall(_run_batch, args, metrics, 0)
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        _run_batch(args, metrics, args.workers)
+    if metrics is not None:
+        print(metrics.report())
+
+
+def _run_batch(args, metrics, workers):
+    from .batch import date_range_tasks, load_run, manifest_tasks, run_batch
+
+    if args.replay:
+        tasks, name_format, options, settings = load_run(args.replay, args.only)
+        # 只重新生成部分文件时保留原来的 manifest
+        run_batch(tasks, args.out or os.path.dirname(os.path.abspath(args.replay)), workers=workers,
+                  name_format=name_format, settings=settings if args.only is None else None,
+                  incremental=args.incremental, metrics=metrics, **options)
+        return
+
+    if args.manifest:
+        tasks, entropy = manifest_tasks(args.manifest, args.seed, args.utc_offset)
+    else:
+        tasks, entropy = date_range_tasks(datetime.strptime(args.start, "%Y-%m-%d"), args.days, args.seed,
+                                          args.utc_offset, **_ranges(args))
+    settings = {"seed": entropy, "utc_offset": args.utc_offset,
+                "route_file": os.path.abspath(args.route) if args.route else None, "simplify": args.simplify}
+    run_batch(tasks, args.out, workers=workers, name_format=args.name, settings=settings,
+              incremental=args.incremental, metrics=metrics, **_options(args))
+
+
+def cmd_validate(parser, args):
+    import json
+    from .validate import format_summary, load_schema, summarize, validate_paths
+
+    if not args.paths:
+        parser.error("需要指定 TCX 文件或目录")
+    if args.xsd:
+        try:
+            load_schema(args.xsd)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    results = validate_paths(args.paths, args.pattern, args.workers, xsd=args.xsd, max_speed=args.max_speed,
+                             max_accel=args.max_accel, tolerance=args.tolerance)
+    for result in results:
+        if result["problems"] and not args.quiet:
+            print(result["path"])
+            for check, item in result["problems"].items():
+                print(f"  {check}: {item['first']}" + (f"（共 {item['count']} 处）" if item["count"] > 1 else ""))
+    summary = summarize(results)
+    print(format_summary(summary))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"summary": summary, "files": [r for r in results if r["problems"]]}, f, indent=2,
+                      ensure_ascii=False)
+    return 1 if summary["failed"] else 0
+
+
+def cmd_bench(parser, args):
+    from .bench import run, save
+
+    # 0 表示默认采样间隔，与不带 --interval 的 batch 相同
+    intervals = [interval or None for interval in args.interval]
+    save(run(args.sizes, args.repeat, intervals, output_format=args.format, sensors=args.sensors, dem_dir=args.dem),
+         args.json, args.csv)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tcxgen", description="生成模拟跑步活动的 TCX / FIT 文件")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    config = argparse.ArgumentParser(add_help=False)
+    config.add_argument("--config", help="TOML / YAML 配置文件，命令行参数优先")
+
+    activity = argparse.ArgumentParser(add_help=False)
+    activity.add_argument("--seed", type=int, default=None)
+    activity.add_argument("--utc-offset", type=float, default=8, help="本地时间与 UTC 的时差（小时）")
+    activity.add_argument("--earliest", default="17:00", help="最早开跑时间（本地，HH:MM）")
+    activity.add_argument("--latest", default="20:12", help="最晚开跑时间（本地，HH:MM）")
+    activity.add_argument("--distance-range", type=float, nargs=2, default=[3020, 3230], metavar=("MIN", "MAX"),
+                          help="随机距离范围（米）")
+    activity.add_argument("--duration-range", type=float, nargs=2, default=[25*60, 30*60], metavar=("MIN", "MAX"),
+                          help="随机用时范围（秒）")
+    activity.add_argument("--format", choices=FORMATS, default="tcx", help="输出格式")
+    activity.add_argument("--interval", type=float, default=None, help="采样间隔（秒），例如 1 表示 1 Hz")
+    laps = activity.add_mutually_exclusive_group()
+    laps.add_argument("--lap-distance", type=float, default=None, help="按距离自动分圈（米），例如 1000")
+    laps.add_argument("--lap-per-loop", action="store_true", help="路线每跑一圈记一圈")
+    activity.add_argument("--sensors", action="store_true", help="生成心率、步频和速度通道")
+    activity.add_argument("--dem", default=None, help="SRTM .hgt 瓦片目录，用于查询真实海拔")
+    activity.add_argument("--route", default=None, help="GPX / KML / GeoJSON 路线文件，默认使用内置操场路线")
+    activity.add_argument("--simplify", type=float, default=None, help="Douglas–Peucker 简化容差（米）")
+    activity.add_argument("--route-cache", default=None, help="路线模板 .npz 缓存目录")
+
+    generate = commands.add_parser("generate", parents=[config, activity], help="生成单个活动")
+    generate.add_argument("--date", help="日期 YYYY-MM-DD")
+    generate.add_argument("--start-time", default=None, help="开跑时间（本地，HH:MM:SS），默认随机")
+    generate.add_argument("--distance", type=float, default=None, help="距离（米），默认随机")
+    generate.add_argument("--duration", type=float, default=None, help="用时（秒），默认随机")
+    generate.add_argument("--index", type=int, default=0, help="活动序号，与 --seed 一起决定随机数")
+    generate.add_argument("--out", help="输出文件，扩展名按 --format 补全")
+    generate.set_defaults(handler=cmd_generate)
+
+    batch = commands.add_parser("batch", parents=[config, activity], help="并行批量生成活动")
+    batch.add_argument("--start", help="起始日期 YYYY-MM-DD，配合 --days 使用")
+    batch.add_argument("--manifest", help="CSV 清单：date,start_time,distance,duration")
+    batch.add_argument("--replay", help="按之前输出的 manifest.json 重新生成")
+    batch.add_argument("--only", type=int, nargs="+", default=None, help="配合 --replay，只重新生成这些序号")
+    batch.add_argument("--days", type=int, default=30)
+    batch.add_argument("--out", help="输出目录，--replay 时默认为 manifest 所在目录")
+    batch.add_argument("--workers", type=int, default=None, help="进程数，0 表示在当前进程里顺序生成")
+    batch.add_argument("--name", default="{date.month}_{date.day}",
+                       help="文件名模板（不含扩展名），可用 {index} 和 {date}")
+    batch.add_argument("--incremental", action="store_true", help="跳过输入未变且文件仍在的活动")
+    batch.add_argument("--metrics", action="store_true", help="结束时输出各阶段耗时、点数和字节数")
+    batch.add_argument("--profile", default=None, metavar="PSTATS",
+                       help="用 cProfile 运行并把 pstats 结果写入该文件；此时在主进程里顺序生成")
+    batch.set_defaults(handler=cmd_batch)
+
+    validate = commands.add_parser("validate", parents=[config], help="检查 TCX 文件的结构、一致性和物理合理性")
+    validate.add_argument("paths", nargs="*", help="TCX 文件或目录（递归查找）")
+    validate.add_argument("--pattern", default="*.tcx", help="目录中匹配的文件名，例如 *.tcx.gz")
+    validate.add_argument("--workers", type=int, default=None)
+    validate.add_argument("--max-speed", type=float, default=12.5, help="相邻两点间允许的最大速度（m/s）")
+    validate.add_argument("--max-accel", type=float, default=8.0, help="允许的最大加速度（m/s²）")
+    validate.add_argument("--tolerance", type=float, default=0.005, help="圈统计与轨迹点之间允许的相对误差")
+    validate.add_argument("--xsd", default=None, help="另外按该 XSD 文件完整校验（需要 lxml）")
+    validate.add_argument("--report", default=None, help="把汇总和有问题的文件写入 JSON")
+    validate.add_argument("--quiet", action="store_true", help="只输出汇总")
+    validate.set_defaults(handler=cmd_validate)
+
+    bench = commands.add_parser("bench", parents=[config], help="生成速度与内存基准测试")
+    bench.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="每个活动的点数")
+    bench.add_argument("--repeat", type=int, default=3)
+    bench.add_argument("--interval", type=float, nargs="+", default=[0, 1.0],
+                       help="采样间隔（秒），可以给多个；0 为默认间隔（与 formalBetter.py 相同）")
+    bench.add_argument("--format", choices=FORMATS, default="tcx", help="输出格式")
+    bench.add_argument("--sensors", action="store_true", help="同时生成心率、步频和速度")
+    bench.add_argument("--dem", default=None, help="SRTM .hgt 瓦片目录，同时测 DEM 海拔查询")
+    bench.add_argument("--json", help="结果写入 JSON 文件")
+    bench.add_argument("--csv", help="结果写入 CSV 文件")
+    bench.set_defaults(handler=cmd_bench)
+
+    return parser, commands.choices
+
+
+def _check_exclusive(command, args, options):
+    # 配置文件的值作为默认值，绕过了 argparse 的互斥检查，这里补上：
+    # 配置文件里同组的项同时给出时报错；命令行给出了其中一项时，配置文件里同组的其它项不再生效
+    for group in command._mutually_exclusive_groups:
+        dests = [action.dest for action in group._group_actions]
+        on_command_line = [a.dest for a in group._group_actions if getattr(args, a.dest) != a.default]
+        in_config = [dest for dest in dests if options.get(dest) not in (None, False)]
+        if on_command_line:
+            for dest in dests:
+                if dest not in on_command_line:
+                    options.pop(dest, None)
+        elif len(in_config) > 1:
+            command.error(f"配置项 {' 和 '.join(in_config)} 不能同时使用")
+
+
+def main(argv=None):
+    parser, commands = build_parser()
+    args = parser.parse_args(argv)
+    command = commands[args.command]
+    if args.config:
+        # 配置文件里的值作为默认值，再解析一遍命令行，使命令行参数优先
+        from .config import command_options, load_config
+        valid = {name: {action.dest for action in sub._actions} - {"help", "config"}
+                 for name, sub in commands.items()}
+        try:
+            options = command_options(load_config(args.config), args.command, valid,
+                                      os.path.dirname(os.path.abspath(args.config)))
+        except (OSError, ValueError) as e:
+            command.error(str(e))
+        _check_exclusive(command, args, options)
+        command.set_defaults(**options)
+        args = parser.parse_args(argv)
+    return args.handler(command, args)
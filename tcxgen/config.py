@@ -0,0 +1,67 @@
+import os
+from datetime import date, time
+
+# 这些配置项是路径，相对路径按配置文件所在目录解析
+PATH_KEYS = {"out", "manifest", "replay", "route", "route_cache", "dem", "json", "csv", "paths", "profile", "xsd",
+             "report"}
+
+
+def load_config(path):
+    # 按扩展名读取 TOML 或 YAML；YAML 需要另外安装 PyYAML
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python 3.10 及以下
+            import tomli as tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if ext in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("读取 YAML 配置需要安装 PyYAML") from None
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    raise ValueError(f"不支持的配置格式: {ext}")
+
+
+def _resolve(value, base_dir):
+    if isinstance(value, list):
+        return [_resolve(v, base_dir) for v in value]
+    return os.path.join(base_dir, os.path.expanduser(value))
+
+
+def _normalize(key, value, base_dir):
+    key = key.replace("-", "_")
+    # TOML / YAML 里不加引号的日期和时间会被解析成对象，统一换回字符串
+    if isinstance(value, (date, time)):
+        value = value.isoformat()
+    if key in PATH_KEYS and value is not None:
+        value = _resolve(value, base_dir)
+    return key, value
+
+
+def command_options(config, command, valid, base_dir="."):
+    # 顶层的标量项对所有用得到它的子命令生效，[command] 表里的项只对该子命令生效并覆盖顶层；
+    # 键名中的 - 换成 _，与命令行参数的 dest 一致。
+    # valid 为 {子命令: 可用的键}；顶层的键任何子命令都用不到、表名不是子命令、
+    # 或表里的键该子命令用不到时报错，拼错的键不会被悄悄忽略
+    known = set().union(*valid.values())
+    result = {}
+    for key, value in config.items():
+        if isinstance(value, dict):
+            if key not in valid:
+                raise ValueError(f"未知的配置表: [{key}]")
+            continue
+        key, value = _normalize(key, value, base_dir)
+        if key not in known:
+            raise ValueError(f"未知的配置项: {key}")
+        if key in valid[command]:
+            result[key] = value
+    for key, value in config.get(command, {}).items():
+        key, value = _normalize(key, value, base_dir)
+        if key not in valid[command]:
+            raise ValueError(f"[{command}] 中未知的配置项: {key}")
+        result[key] = value
+    return result
@@ -0,0 +1,89 @@
+import os
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from .track import Track
+
+VOID = -32768  # SRTM 空洞值
+
+
+def tile_name(lat0, lon0):
+    # 以西南角命名，例如 N39E121.hgt
+    return f"{'N' if lat0 >= 0 else 'S'}{abs(lat0):02d}{'E' if lon0 >= 0 else 'W'}{abs(lon0):03d}.hgt"
+
+
+class DEM:
+    """本地 SRTM .hgt 高程数据，按需 memmap 打开瓦片，只读用到的页。
+
+    最近使用的 max_tiles 个瓦片保持打开，批量查询同一区域时不会重复打开。
+    """
+
+    def __init__(self, directory, max_tiles=16):
+        self.directory = directory
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+
+    def tile(self, lat0, lon0):
+        key = (lat0, lon0)
+        if key in self._tiles:
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+
+        path = os.path.join(self.directory, tile_name(lat0, lon0))
+        data = None
+        if os.path.exists(path):
+            # SRTM1 为 3601x3601，SRTM3 为 1201x1201，大端 int16，第一行是北边
+            size = int(round((os.path.getsize(path) // 2) ** 0.5))
+            data = np.memmap(path, dtype=">i2", mode="r", shape=(size, size))
+        self._tiles[key] = data
+        if len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return data
+
+    def lookup(self, lat, lon):
+        # 对整段轨迹做双线性插值，没有瓦片或遇到空洞的点返回 NaN
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        out = np.full(lat.shape, np.nan)
+        lat0 = np.floor(lat).astype(np.int64)
+        lon0 = np.floor(lon).astype(np.int64)
+        keys, inverse = np.unique(np.stack([lat0, lon0], axis=-1).reshape(-1, 2), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        for k, (tlat, tlon) in enumerate(keys):
+            data = self.tile(int(tlat), int(tlon))
+            if data is None:
+                continue
+            idx = np.nonzero(inverse == k)[0]
+            n = data.shape[0] - 1
+            y = (tlat + 1 - lat.flat[idx]) * n
+            x = (lon.flat[idx] - tlon) * n
+            r = np.clip(np.floor(y).astype(np.int64), 0, n - 1)
+            c = np.clip(np.floor(x).astype(np.int64), 0, n - 1)
+            fy, fx = y - r, x - c
+
+            corners = np.stack([data[r, c], data[r, c + 1], data[r + 1, c], data[r + 1, c + 1]]).astype(np.float64)
+            corners[corners == VOID] = np.nan
+            top = corners[0] * (1 - fx) + corners[1] * fx
+            bottom = corners[2] * (1 - fx) + corners[3] * fx
+            out.flat[idx] = top * (1 - fy) + bottom * fy
+        return out
+
+    def apply(self, track):
+        # 用 DEM 高程替换海拔，查不到的点保留原值
+        alt = self.lookup(track.lat, track.lon)
+        alt = np.where(np.isnan(alt), track.alt, alt)
+        return Track(track.lat, track.lon, alt, track.time, track.distance,
+                     **{name: getattr(track, name) for name in track.sensor_channels()})
+
+    def apply_all(self, chunks):
+        for chunk in chunks:
+            yield self.apply(chunk)
+
+
+@lru_cache(maxsize=None)
+def open_dem(directory):
+    # 每个进程每个目录一个 DEM，瓦片缓存在多次任务间共享
+    return DEM(directory)
@@ -0,0 +1,102 @@
+from functools import lru_cache
+
+import numpy as np
+
+R = 6371000  # 地球半径，单位为米
+
+# 纬度方向每度的米数，与经度无关
+METERS_PER_DEGREE = np.pi / 180 * R
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    # 大圆距离（米），参数可以是标量或等长数组
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = np.radians(lat2 - lat1)
+    delta_lambda = np.radians(lon2 - lon1)
+    a = np.sin(delta_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
+
+def equirectangular(lat1, lon1, lat2, lon2):
+    # 等距圆柱近似（米），几公里内与 haversine 相差不到万分之一，少一半三角函数
+    x = np.radians(lon2 - lon1) * np.cos(np.radians((lat1 + lat2) / 2))
+    y = np.radians(lat2 - lat1)
+    return R * np.hypot(x, y)
+
+
+def segment_lengths(lat, lon):
+    # 相邻两点之间的距离，长度比输入少 1
+    return haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+
+@lru_cache(maxsize=256)
+def lon_scale(lat0):
+    # 纬度 lat0 处经度方向每度的米数；同一路线反复投影时只算一次 cos
+    return METERS_PER_DEGREE * float(np.cos(np.radians(lat0)))
+
+
+class LocalFrame:
+    """以 (lat0, lon0, alt0) 为原点的局部东-北-天坐标，单位为米。
+
+    在原点纬度处展开的等距圆柱投影，适用于操场、公园这种几公里范围内的路线。
+    """
+
+    def __init__(self, lat0, lon0, alt0=0.0):
+        self.lat0 = float(lat0)
+        self.lon0 = float(lon0)
+        self.alt0 = float(alt0)
+        self.kx = lon_scale(self.lat0)
+        self.ky = METERS_PER_DEGREE
+
+    @classmethod
+    def around(cls, points):
+        # 以路线各点的平均位置为原点
+        points = np.asarray(points, dtype=np.float64)
+        return cls(points[:, 0].mean(), points[:, 1].mean())
+
+    def to_enu(self, lat, lon, alt=None):
+        east = (np.asarray(lon, dtype=np.float64) - self.lon0) * self.kx
+        north = (np.asarray(lat, dtype=np.float64) - self.lat0) * self.ky
+        if alt is None:
+            return east, north
+        return east, north, np.asarray(alt, dtype=np.float64) - self.alt0
+
+    def to_geodetic(self, east, north, up=None):
+        lat = self.lat0 + np.asarray(north, dtype=np.float64) / self.ky
+        lon = self.lon0 + np.asarray(east, dtype=np.float64) / self.kx
+        if up is None:
+            return lat, lon
+        return lat, lon, self.alt0 + np.asarray(up, dtype=np.float64)
+
+
+def offset(lat, lon, east, north):
+    # 把经纬度按米平移，east / north 可以是数组
+    lat = np.asarray(lat, dtype=np.float64)
+    kx = METERS_PER_DEGREE * np.cos(np.radians(lat))
+    return lat + np.asarray(north) / METERS_PER_DEGREE, lon + np.asarray(east) / kx
+
+
+def arc(center_lat, center_lon, radius, start_angle, end_angle, num_points):
+    # 以 (center_lat, center_lon) 为圆心、radius 米为半径的圆弧；角度从正东起逆时针，单位为度
+    angles = np.radians(np.linspace(start_angle, end_angle, num_points))
+    return LocalFrame(center_lat, center_lon).to_geodetic(radius * np.cos(angles), radius * np.sin(angles))
+
+
+def arc_center(lat1, lon1, lat2, lon2, sweep):
+    # 从点 1 到点 2、转过 sweep 度（正为逆时针，即向左转）的圆弧，由两个端点推出圆心和半径。
+    # 返回 (圆心纬度, 圆心经度, 半径米, 起始角, 终止角)，可直接交给 arc
+    if not 0 < abs(sweep) <= 360:
+        raise ValueError("sweep 需要在 (0, 360] 度之间")
+    frame = LocalFrame(lat1, lon1)
+    x2, y2 = frame.to_enu(lat2, lon2)
+    chord = float(np.hypot(x2, y2))
+    half = np.radians(abs(sweep)) / 2
+    radius = chord / (2 * np.sin(half))
+    # 圆心在弦的垂直平分线上，逆时针时在弦的左侧
+    side = radius * np.cos(half) * np.sign(sweep) / chord
+    cx, cy = x2 / 2 - y2 * side, y2 / 2 + x2 * side
+    start = float(np.degrees(np.arctan2(-cy, -cx)))
+    center_lat, center_lon = frame.to_geodetic(cx, cy)
+    return float(center_lat), float(center_lon), float(radius), start, start + sweep
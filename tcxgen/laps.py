@@ -0,0 +1,109 @@
+import numpy as np
+
+
+class LapAggregator:
+    """按距离或按点数自动分圈，单遍累计每圈的统计。
+
+    distance: 每圈米数（例如 1000 为每公里一圈，或路线一圈的长度）
+    points:   每圈点数（按顶点序号插值的路线，一圈的点数固定）
+    两者都不给时整个活动为一圈。
+    trigger: TCX 的 TriggerMethod，默认按分圈方式取 Distance / Location / Manual
+    每一步（相邻两点之间）记在起点所在的圈上，所以各圈时间、距离之和等于全程。
+    只保留当前这一圈的点，圈结束时连同统计一起交出。
+    """
+
+    def __init__(self, distance=None, points=None, calories_per_meter=0.1, trigger=None):
+        if distance is not None and points is not None:
+            raise ValueError("distance 和 points 只能指定一个")
+        self.split_distance = distance
+        self.split_points = points
+        self.calories_per_meter = calories_per_meter
+        if trigger is None:
+            trigger = "Distance" if distance is not None else "Location" if points is not None else "Manual"
+        self.trigger = trigger
+        self._current = None
+        self._prev = None
+        self._seen = 0
+
+    def _lap_ids(self, chunk):
+        if self.split_distance is not None:
+            return np.floor(chunk.distance / self.split_distance).astype(np.int64)
+        if self.split_points is not None:
+            return (self._seen + np.arange(len(chunk))) // self.split_points
+        return np.zeros(len(chunk), dtype=np.int64)
+
+    def _start(self, lap_id, start_time):
+        self._current = {"id": lap_id, "start_time": start_time, "pieces": [], "total_time": 0.0,
+                         "distance": 0.0, "max_speed": 0.0, "ascent": 0.0, "descent": 0.0, "points": 0}
+
+    def _finish(self):
+        lap, self._current = self._current, None
+        summary = {key: lap[key] for key in ("start_time", "total_time", "distance", "max_speed",
+                                             "ascent", "descent", "points")}
+        summary["calories"] = int(lap["distance"] * self.calories_per_meter)
+        summary["speed"] = lap["distance"] / lap["total_time"] if lap["total_time"] > 0 else 0.0
+        return summary, lap["pieces"]
+
+    def add(self, chunk):
+        # 处理一块轨迹，返回这块里结束的圈 [(summary, pieces), ...]
+        n = len(chunk)
+        if n == 0:
+            return []
+        ids = self._lap_ids(chunk)
+        t = chunk.time.astype("datetime64[us]").astype(np.int64) / 1e6
+        d, a = chunk.distance, chunk.alt
+
+        # 接上上一块的最后一个点，使跨块的那一步也被计入
+        if self._prev is not None:
+            pt, pd, pa, pid = self._prev
+            t, d, a = np.concatenate(([pt], t)), np.concatenate(([pd], d)), np.concatenate(([pa], a))
+            step_ids = np.concatenate(([pid], ids[:-1]))
+        else:
+            step_ids = ids[:-1]
+        dt, dd, da = np.diff(t), np.diff(d), np.nan_to_num(np.diff(a))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            speed = np.where(dt > 0, dd / dt, 0.0)
+
+        closed = []
+        for lap_id in np.unique(np.concatenate((step_ids, ids))):
+            if self._current is None or lap_id != self._current["id"]:
+                if self._current is not None:
+                    closed.append(self._finish())
+                first = np.searchsorted(ids, lap_id)
+                self._start(lap_id, chunk.time[first])
+
+            lap = self._current
+            s0, s1 = np.searchsorted(step_ids, lap_id), np.searchsorted(step_ids, lap_id, side="right")
+            if s1 > s0:
+                lap["total_time"] += float(dt[s0:s1].sum())
+                lap["distance"] += float(dd[s0:s1].sum())
+                lap["max_speed"] = max(lap["max_speed"], float(speed[s0:s1].max()))
+                lap["ascent"] += float(da[s0:s1][da[s0:s1] > 0].sum())
+                lap["descent"] -= float(da[s0:s1][da[s0:s1] < 0].sum())
+            p0, p1 = np.searchsorted(ids, lap_id), np.searchsorted(ids, lap_id, side="right")
+            if p1 > p0:
+                lap["pieces"].append(chunk[p0:p1])
+                lap["points"] += int(p1 - p0)
+
+        self._prev = (t[-1], d[-1], a[-1], ids[-1])
+        self._seen += n
+        return closed
+
+    def close(self):
+        if self._current is None:
+            return None
+        return self._finish()
+
+    def split(self, chunks, start_time=None):
+        # 没有任何轨迹点时也交出一个从 start_time 开始的空圈：TCX 的 Activity 至少要有一个 Lap
+        empty = True
+        for chunk in chunks:
+            for lap in self.add(chunk):
+                empty = False
+                yield lap
+        last = self.close()
+        if last is None and empty:
+            self._start(0, start_time)
+            last = self._finish()
+        if last is not None:
+            yield last
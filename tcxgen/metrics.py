@@ -0,0 +1,78 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class Metrics:
+    """按阶段累计耗时和计数。
+
+    阶段可以嵌套，每个阶段只记自身用时（减去其中嵌套阶段的用时）。按块惰性生成时，
+    生成发生在写入过程中，这样 serialize 不会把生成的时间也算进去。
+    """
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.times[name] += elapsed - self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def timed(self, name, chunks):
+        # 把迭代器每次产出下一块的时间记到 name 阶段
+        iterator = iter(chunks)
+        while True:
+            with self.stage(name):
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def as_dict(self):
+        return {"times": dict(self.times), "counts": dict(self.counts)}
+
+    def merge(self, other):
+        # other 为另一个 Metrics 或 as_dict() 的结果，例如子进程交回来的统计
+        if isinstance(other, Metrics):
+            other = other.as_dict()
+        for name, seconds in other["times"].items():
+            self.times[name] += seconds
+        for name, n in other["counts"].items():
+            self.counts[name] += n
+
+    def report(self):
+        total = sum(self.times.values()) or 1.0
+        lines = [f"{name:<12} {seconds:10.3f} s  {seconds / total:6.1%}"
+                 for name, seconds in sorted(self.times.items(), key=lambda item: -item[1])]
+        lines += [f"{name:<12} {n:>12}" for name, n in sorted(self.counts.items())]
+        return "\n".join(lines)
+
+
+class NullMetrics:
+    """关闭统计时使用，所有方法都不做事。"""
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def count(self, name, n=1):
+        pass
+
+    def timed(self, name, chunks):
+        return chunks
+
+
+NULL_METRICS = NullMetrics()
@@ -0,0 +1,217 @@
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from .geodesy import LocalFrame
+
+
+def _local(tag):
+    return tag.rpartition("}")[2]
+
+
+def _as_route(coords, default_alt):
+    points = np.asarray(coords, dtype=np.float64)
+    if points.ndim != 2 or len(points) < 2:
+        raise ValueError("路线至少需要两个点")
+    if points.shape[1] == 2:
+        points = np.column_stack([points, np.full(len(points), default_alt)])
+    return points[:, :3]
+
+
+def read_gpx(path, default_alt=0.0):
+    # 优先取 trkpt，没有轨迹时退回 rtept
+    coords = {"trkpt": [], "rtept": []}
+    for _, elem in ET.iterparse(path):
+        name = _local(elem.tag)
+        if name in coords:
+            ele = next((c.text for c in elem if _local(c.tag) == "ele"), None)
+            coords[name].append((float(elem.get("lat")), float(elem.get("lon")),
+                                 float(ele) if ele else default_alt))
+            elem.clear()
+    return _as_route(coords["trkpt"] or coords["rtept"], default_alt)
+
+
+def read_kml(path, default_alt=0.0):
+    # 只取 LineString 和 gx:Track 的坐标，标注起终点的 Point、Polygon 等不属于路线
+    coords = []
+    for _, elem in ET.iterparse(path):
+        name = _local(elem.tag)
+        if name == "LineString":
+            for child in elem:
+                if _local(child.tag) == "coordinates" and child.text:
+                    # KML 坐标顺序为 lon,lat[,alt]，以空白分隔
+                    for item in child.text.split():
+                        values = [float(v) for v in item.split(",")]
+                        coords.append((values[1], values[0], values[2] if len(values) > 2 else default_alt))
+            elem.clear()
+        elif name == "Track":
+            # gx:coord 为 "lon lat [alt]"
+            for child in elem:
+                if _local(child.tag) == "coord" and child.text:
+                    values = [float(v) for v in child.text.split()]
+                    coords.append((values[1], values[0], values[2] if len(values) > 2 else default_alt))
+            elem.clear()
+    return _as_route(coords, default_alt)
+
+
+def _geojson_lines(obj):
+    if obj is None:
+        # 没有几何的 Feature（"geometry": null）是合法的，跳过
+        return
+    kind = obj.get("type")
+    if kind == "FeatureCollection":
+        for feature in obj["features"]:
+            yield from _geojson_lines(feature)
+    elif kind == "Feature":
+        yield from _geojson_lines(obj["geometry"])
+    elif kind == "LineString":
+        yield obj["coordinates"]
+    elif kind == "MultiLineString":
+        yield from obj["coordinates"]
+    elif kind == "GeometryCollection":
+        for geometry in obj["geometries"]:
+            yield from _geojson_lines(geometry)
+
+
+def read_geojson(path, default_alt=0.0):
+    with open(path) as f:
+        obj = json.load(f)
+    coords = []
+    for line in _geojson_lines(obj):
+        # GeoJSON 同样是 lon,lat[,alt]
+        coords.extend((c[1], c[0], c[2] if len(c) > 2 else default_alt) for c in line)
+    return _as_route(coords, default_alt)
+
+
+READERS = {".gpx": read_gpx, ".kml": read_kml, ".geojson": read_geojson, ".json": read_geojson}
+
+
+def load_route(path, tolerance=None, default_alt=0.0):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"不支持的路线格式: {ext}")
+    points = READERS[ext](path, default_alt)
+    if tolerance:
+        points = simplify(points, tolerance)
+    return points
+
+
+def _point_segment_distance(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(length2 > 0, ((px - ax) * dx + (py - ay) * dy) / length2, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy)), t
+
+
+def simplify(points, tolerance):
+    # Douglas–Peucker，tolerance 单位为米；用栈代替递归，每段一次向量化求距离
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 3:
+        return points
+    x, y = LocalFrame.around(points).to_enu(points[:, 0], points[:, 1])
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        d, _ = _point_segment_distance(x[first + 1:last], y[first + 1:last], x[first], y[first], x[last], y[last])
+        i = int(np.argmax(d))
+        if d[i] > tolerance:
+            i += first + 1
+            keep[i] = True
+            stack.append((first, i))
+            stack.append((i, last))
+    return points[keep]
+
+
+def _segment_cells(ax, ay, bx, by, cell_size):
+    # 线段经过的网格：在与网格线的交点处把线段切开，每一小段的中点落在它经过的一个网格里
+    cuts = [0.0, 1.0]
+    for a, b in ((ax, bx), (ay, by)):
+        if a != b:
+            lines = np.arange(np.floor(min(a, b) / cell_size) + 1, np.floor(max(a, b) / cell_size) + 1) * cell_size
+            cuts.extend((lines - a) / (b - a))
+    t = np.unique(np.clip(cuts, 0.0, 1.0))
+    t = (t[:-1] + t[1:]) / 2 if len(t) > 1 else t
+    cx = np.floor((ax + t * (bx - ax)) / cell_size).astype(np.int64)
+    cy = np.floor((ay + t * (by - ay)) / cell_size).astype(np.int64)
+    return zip(cx.tolist(), cy.tolist())
+
+
+class SegmentIndex:
+    """路线线段的均匀网格索引，用于查询最近线段。
+
+    每条线段只登记到它实际经过的网格，斜穿很多网格的长线段不会占满整个包围盒。
+    """
+
+    def __init__(self, points, cell_size=50.0):
+        points = np.asarray(points, dtype=np.float64)
+        if len(points) < 2:
+            raise ValueError("路线至少需要两个点")
+        self.frame = LocalFrame.around(points)
+        x, y = self.frame.to_enu(points[:, 0], points[:, 1])
+        self.ax, self.ay, self.bx, self.by = x[:-1], y[:-1], x[1:], y[1:]
+        self.cell_size = cell_size
+
+        # 两端在同一网格里的线段（绝大多数）直接登记，其余的逐格求出经过的网格
+        ca = np.floor(np.column_stack((self.ax, self.ay)) / cell_size).astype(np.int64)
+        cb = np.floor(np.column_stack((self.bx, self.by)) / cell_size).astype(np.int64)
+        cells = {}
+        for s, (cell_a, cell_b) in enumerate(zip(map(tuple, ca.tolist()), map(tuple, cb.tolist()))):
+            if cell_a == cell_b:
+                cells.setdefault(cell_a, []).append(s)
+                continue
+            for cell in _segment_cells(self.ax[s], self.ay[s], self.bx[s], self.by[s], cell_size):
+                cells.setdefault(cell, []).append(s)
+        self.cells = {k: np.array(v, dtype=np.int64) for k, v in cells.items()}
+        keys = np.array(list(self.cells))
+        self.bounds = (keys[:, 0].min(), keys[:, 0].max(), keys[:, 1].min(), keys[:, 1].max())
+
+    def __len__(self):
+        return len(self.ax)
+
+    def _ring(self, cx, cy, r):
+        if r == 0:
+            yield cx, cy
+            return
+        for i in range(-r, r + 1):
+            yield cx + i, cy - r
+            yield cx + i, cy + r
+        for j in range(-r + 1, r):
+            yield cx - r, cy + j
+            yield cx + r, cy + j
+
+    def nearest(self, lat, lon):
+        # 返回 (线段序号, 距离米, 最近点在线段上的比例位置 0~1)
+        px, py = self.frame.to_enu(lat, lon)
+        cx, cy = int(np.floor(px / self.cell_size)), int(np.floor(py / self.cell_size))
+        gx0, gx1, gy0, gy1 = self.bounds
+        if not (gx0 <= cx <= gx1 and gy0 <= cy <= gy1):
+            # 查询点在网格外，直接对全部线段求一次
+            d, t = _point_segment_distance(px, py, self.ax, self.ay, self.bx, self.by)
+            i = int(np.argmin(d))
+            return i, float(d[i]), float(t[i])
+
+        # 从查询点所在的网格一圈圈向外找，最多找到覆盖全部网格为止
+        max_ring = max(cx - gx0, gx1 - cx, cy - gy0, gy1 - cy)
+
+        best = (-1, np.inf, 0.0)
+        for r in range(max_ring + 1):
+            # 第 r 圈网格内的点距离至少为 (r - 1) * cell_size，比当前最优更远时停止
+            if (r - 1) * self.cell_size > best[1]:
+                break
+            candidates = [self.cells[c] for c in self._ring(cx, cy, r) if c in self.cells]
+            if not candidates:
+                continue
+            s = np.unique(np.concatenate(candidates))
+            d, t = _point_segment_distance(px, py, self.ax[s], self.ay[s], self.bx[s], self.by[s])
+            i = int(np.argmin(d))
+            if d[i] < best[1]:
+                best = (int(s[i]), float(d[i]), float(t[i]))
+        return best
@@ -0,0 +1,113 @@
+import numpy as np
+
+from .geodesy import offset
+from .track import Track
+
+
+def exponential_response(x, alpha, y0):
+    # 一阶滞后 y[n] = y[n-1] + alpha * (x[n] - y[n-1]) 的闭式解，用卷积一次算完；
+    # 核在衰减到 1e-9 以下后截断
+    n = len(x)
+    m = n if alpha >= 1 else min(n, int(np.log(1e-9) / np.log(1 - alpha)) + 1)
+    decay = (1 - alpha) ** np.arange(m)
+    y = np.convolve(x, alpha * decay)[:n]
+    y += y0 * (1 - alpha) ** np.arange(1, n + 1)
+    return y
+
+
+class SensorModel:
+    """由配速生成心率、步频和速度通道。
+
+    心率按速度给出目标值，再以时间常数 hr_tau 秒做指数响应（按采样间隔 interval 秒离散）；
+    步频随速度线性增加。两者都加上有界噪声。跨块调用时保留滤波状态，噪声按点依次抽取，
+    所以整条轨迹一次处理和按任意大小分块处理的结果相同。
+    """
+
+    def __init__(self, rng, interval=1.0, hr_rest=70.0, hr_max=190.0, hr_per_speed=30.0, hr_tau=30.0, hr_noise=1.5,
+                 cadence_base=150.0, cadence_per_speed=8.0, cadence_noise=2.0):
+        self.rng = rng
+        self.alpha = 1 - np.exp(-interval / hr_tau)
+        self.hr_rest = hr_rest
+        self.hr_max = hr_max
+        self.hr_per_speed = hr_per_speed
+        self.hr_tau = hr_tau
+        self.hr_noise = hr_noise
+        self.cadence_base = cadence_base
+        self.cadence_per_speed = cadence_per_speed
+        self.cadence_noise = cadence_noise
+        self._hr = hr_rest
+        self._prev = None
+
+    def _noise(self, n):
+        # 每个点依次抽心率和步频的噪声，截断在 ±2 个标准差以内
+        scale = np.array([self.hr_noise, self.cadence_noise])
+        noise = np.clip(self.rng.standard_normal((n, 2)), -2.0, 2.0) * scale
+        return noise[:, 0], noise[:, 1]
+
+    def apply(self, chunk):
+        n = len(chunk)
+        if n == 0:
+            return chunk
+        t = chunk.time.astype(np.int64) / 1e6
+        d = chunk.distance
+        if self._prev is not None:
+            t, d = np.concatenate(([self._prev[0]], t)), np.concatenate(([self._prev[1]], d))
+        dt, dd = np.diff(t), np.diff(d)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            step_speed = np.where(dt > 0, dd / dt, 0.0)
+        # 每个点的速度取到达该点那一步；活动的第一个点还没有起跑，速度为 0。
+        # 不向后看，结果才与分块方式无关
+        if self._prev is None:
+            speed = np.concatenate(([0.0], step_speed))
+        else:
+            speed = step_speed
+        self._prev = (t[-1], d[-1])
+
+        hr_noise, cadence_noise = self._noise(n)
+        target = np.clip(self.hr_rest + self.hr_per_speed * speed, self.hr_rest, self.hr_max)
+        hr = exponential_response(target, self.alpha, self._hr)
+        self._hr = hr[-1]
+        hr = np.clip(np.round(hr + hr_noise), 30, 250)
+
+        cadence = self.cadence_base + self.cadence_per_speed * speed + cadence_noise
+        # TCX 的 RunCadence / Cadence 为每分钟步数的一半（单脚）
+        cadence = np.clip(np.round(cadence / 2), 0, 254)
+
+        return Track(chunk.lat, chunk.lon, chunk.alt, chunk.time, chunk.distance,
+                     heart_rate=hr, cadence=cadence, speed=speed)
+
+    def apply_all(self, chunks):
+        for chunk in chunks:
+            yield self.apply(chunk)
+
+
+class PositionNoise:
+    """缓慢漂移的 GPS 定位误差。
+
+    东、北两个方向各是一个一阶自回归过程：相关时间 tau 秒，稳态标准差 sigma 米。
+    相邻点的误差高度相关，点与点之间的跳动随采样间隔变小，不会因为采样变密而出现
+    虚假的高速。跨块调用时保留状态；随机数按点依次抽取，结果与分块方式无关。
+    """
+
+    def __init__(self, rng, interval, sigma=3.0, tau=20.0):
+        self.rng = rng
+        self.sigma = sigma
+        rho = np.exp(-interval / tau)
+        self.alpha = 1 - rho
+        # exponential_response 的输入放大到使输出的稳态标准差为 sigma
+        self.scale = sigma * np.sqrt(1 - rho ** 2) / self.alpha
+        self._state = None
+
+    def apply(self, chunk):
+        n = len(chunk)
+        if n == 0:
+            return chunk
+        if self._state is None:
+            self._state = self.rng.normal(0.0, self.sigma, 2)
+        draws = self.rng.standard_normal((n, 2)) * self.scale
+        east = exponential_response(draws[:, 0], self.alpha, self._state[0])
+        north = exponential_response(draws[:, 1], self.alpha, self._state[1])
+        self._state = (east[-1], north[-1])
+        lat, lon = offset(chunk.lat, chunk.lon, east, north)
+        return Track(lat, lon, chunk.alt, chunk.time, chunk.distance,
+                     **{name: getattr(chunk, name) for name in chunk.sensor_channels()})
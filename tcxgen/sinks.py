@@ -0,0 +1,88 @@
+import gzip
+import io
+import os
+from contextlib import contextmanager
+
+from . import fitwriter, tcxwriter
+from .metrics import NULL_METRICS
+from .track import Track, concat_tracks
+
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    # 先写同目录下的临时文件，完成后 rename 覆盖目标；中途出错或被打断不会留下写了一半的文件
+    directory, name = os.path.split(os.path.abspath(path))
+    tmp = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+            # 先落盘再 rename，断电后也不会出现内容为空的目标文件
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        # open 本身失败时临时文件并不存在，不能让 unlink 的错误盖住原来的异常
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_tcx(f, track, start_time, total_distance, total_time, laps=None, name=None):
+    # 各格式的写入函数都接受以二进制方式打开的文件对象，可以是磁盘文件、BytesIO 或网络流
+    text = io.TextIOWrapper(f, encoding="utf-8")
+    try:
+        return tcxwriter.write_activity(text, track, start_time, total_distance, total_time, laps=laps)
+    finally:
+        # 交还底层文件对象，不随包装一起关闭
+        text.flush()
+        text.detach()
+
+
+def write_tcx_gz(f, track, start_time, total_distance, total_time, laps=None, name=None):
+    # mtime=0 让相同输入得到相同的压缩文件；name 为写入 gzip 头的文件名
+    with gzip.GzipFile(name or "", "wb", fileobj=f, mtime=0) as raw:
+        return write_tcx(raw, track, start_time, total_distance, total_time, laps=laps)
+
+
+def write_fit(f, track, start_time, total_distance, total_time, laps=None, name=None):
+    # FIT 文件头需要预先知道记录数，按块生成的轨迹先拼起来
+    if not isinstance(track, Track):
+        track = concat_tracks(track)
+    return fitwriter.write_activity(f, track, start_time, total_distance, total_time, laps=laps)
+
+
+# 格式名 -> (扩展名, 写入函数)
+SINKS = {
+    "tcx": (".tcx", write_tcx),
+    "tcx.gz": (".tcx.gz", write_tcx_gz),
+    "fit": (".fit", write_fit),
+}
+
+
+class _TimedWriter(io.RawIOBase):
+    """转发到底层文件的写入，用时记到 write 阶段。"""
+
+    def __init__(self, f, metrics):
+        super().__init__()
+        self.f = f
+        self.metrics = metrics
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        with self.metrics.stage("write"):
+            return self.f.write(data)
+
+
+def write_file(path, output_format, track, start_time, total_distance, total_time, laps=None, metrics=None):
+    # 给出 metrics 时，打开、写入、落盘记到 write 阶段，格式化记到 serialize 阶段
+    if metrics is None:
+        with atomic_open(path, "wb") as f:
+            return SINKS[output_format][1](f, track, start_time, total_distance, total_time, laps=laps, name=path)
+    with metrics.stage("write"), atomic_open(path, "wb") as f:
+        with metrics.stage("serialize"):
+            return SINKS[output_format][1](_TimedWriter(f, metrics), track, start_time, total_distance, total_time,
+                                           laps=laps, name=path)
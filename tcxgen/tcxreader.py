@@ -0,0 +1,127 @@
+import glob
+import os
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .track import Track
+
+LAP_FIELDS = {"TotalTimeSeconds": "total_time", "DistanceMeters": "distance", "Calories": "calories"}
+
+
+def _local(tag):
+    # 去掉 {namespace} 前缀
+    return tag.rpartition("}")[2]
+
+
+def parse_time(text):
+    text = text.strip()
+    if text.endswith("Z"):
+        return text[:-1]
+    # 带时区偏移的时间统一换成 UTC
+    t = datetime.fromisoformat(text)
+    if t.tzinfo is not None:
+        t = t.astimezone(timezone.utc).replace(tzinfo=None)
+    return t.isoformat()
+
+
+def _flush_times(pending, chunks):
+    # 时间字符串按块转换成 datetime64，避免整份文件的字符串都留在内存里
+    chunks.append(np.array([t if t is not None else "NaT" for t in pending], dtype="datetime64[us]"))
+    pending.clear()
+
+
+def read_tcx(path, checker=None):
+    # checker 可选，在每个元素开始和结束时被调用（结束时子元素尚未清除），用于顺带做结构检查
+    times, time_chunks = [], []
+    lat, lon, alt, distance = array("d"), array("d"), array("d"), array("d")
+    laps = []
+    point = None
+    stack = []
+
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if checker is not None:
+                checker.start(elem, stack)
+            stack.append(elem)
+            name = _local(elem.tag)
+            if name == "Trackpoint":
+                point = [None, np.nan, np.nan, np.nan, np.nan]
+            elif name == "Lap":
+                start_time = elem.get("StartTime")
+                laps.append({"start_time": np.datetime64(parse_time(start_time) if start_time else "NaT", "us"),
+                             "total_time": np.nan, "distance": np.nan, "calories": np.nan,
+                             "first_point": len(lat), "points": 0})
+            continue
+
+        stack.pop()
+        name = _local(elem.tag)
+        parent = _local(stack[-1].tag) if stack else None
+        text = elem.text
+        if checker is not None:
+            checker.end(elem, parent)
+
+        if name == "Trackpoint":
+            times.append(point[0])
+            if len(times) == 4096:
+                _flush_times(times, time_chunks)
+            lat.append(point[1])
+            lon.append(point[2])
+            alt.append(point[3])
+            distance.append(point[4])
+            point = None
+            # 已处理的轨迹点直接从 Track 中移除，内存占用与文件大小无关
+            del stack[-1][:]
+        elif point is not None and text is not None:
+            if name == "Time":
+                point[0] = parse_time(text)
+            elif name == "LatitudeDegrees":
+                point[1] = float(text)
+            elif name == "LongitudeDegrees":
+                point[2] = float(text)
+            elif name == "AltitudeMeters":
+                point[3] = float(text)
+            elif name == "DistanceMeters" and parent == "Trackpoint":
+                point[4] = float(text)
+        elif parent == "Lap" and name in LAP_FIELDS and text is not None:
+            laps[-1][LAP_FIELDS[name]] = float(text)
+        elif name == "Lap":
+            laps[-1]["points"] = len(lat) - laps[-1]["first_point"]
+            elem.clear()
+
+    _flush_times(times, time_chunks)
+    time = np.concatenate(time_chunks)
+    return Track(np.frombuffer(lat), np.frombuffer(lon), np.frombuffer(alt), time, np.frombuffer(distance)), laps
+
+
+def _read_columns(path):
+    track, laps = read_tcx(path)
+    return track.time, track.lat, track.lon, track.alt, track.distance, laps
+
+
+def read_directory(directory, pattern="*.tcx", workers=None):
+    # 并行读取整个目录，合并成一张按列存放的表
+    files = sorted(glob.glob(os.path.join(directory, pattern)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_read_columns, files, chunksize=max(1, len(files) // 64)))
+
+    table = {"files": files}
+    counts = [len(r[0]) for r in results]
+    table["file_index"] = np.repeat(np.arange(len(files), dtype=np.int32), counts)
+    for i, column in enumerate(["time", "lat", "lon", "alt", "distance"]):
+        parts = [r[i] for r in results]
+        table[column] = np.concatenate(parts) if parts else np.array([], dtype="datetime64[us]" if i == 0 else np.float64)
+
+    lap_counts = [len(r[5]) for r in results]
+    laps = [lap for r in results for lap in r[5]]
+    table["laps"] = {
+        "file_index": np.repeat(np.arange(len(files), dtype=np.int32), lap_counts),
+        "start_time": np.array([lap["start_time"] for lap in laps], dtype="datetime64[us]"),
+        "total_time": np.array([lap["total_time"] for lap in laps], dtype=np.float64),
+        "distance": np.array([lap["distance"] for lap in laps], dtype=np.float64),
+        "calories": np.array([lap["calories"] for lap in laps], dtype=np.float64),
+    }
+    return table
@@ -0,0 +1,164 @@
+from xml.sax.saxutils import escape
+
+from .laps import LapAggregator
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+TCD_ATTRIB = {
+    "xmlns": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2",
+    "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    "xsi:schemaLocation": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2 http://www.garmin.com/xmlschemas/TrainingCenterDatabasev2.xsd",
+}
+TPX_ATTRIB = {"xmlns": "http://www.garmin.com/xmlschemas/ActivityExtension/v2"}
+
+
+def format_time(t):
+    if isinstance(t, str):
+        return t
+    if hasattr(t, "strftime"):
+        return t.strftime(TIME_FORMAT)
+    # numpy.datetime64
+    return str(t.astype("datetime64[s]")) + "Z"
+
+
+# minidom 在文本和属性里都会转义双引号
+_QUOTE = {'"': "&quot;"}
+
+
+def _attrs(attrib):
+    if not attrib:
+        return ""
+    return "".join(f' {k}="{escape(str(v), _QUOTE)}"' for k, v in attrib.items())
+
+
+class TCXWriter:
+    """边生成边写入的 TCX 输出，格式与 minidom.toprettyxml 完全一致。
+
+    indent / newl 的含义与 toprettyxml 相同，都传 "" 时等价于 toxml()。
+    """
+
+    def __init__(self, f, indent="   ", newl="\n"):
+        self.f = f
+        self.indent = indent
+        self.newl = newl
+        self._tags = []
+        self._lap_speed = None
+
+    def declaration(self):
+        self.f.write('<?xml version="1.0" ?>' + self.newl)
+
+    def start(self, tag, attrib=None):
+        self.f.write(f"{self.indent * len(self._tags)}<{tag}{_attrs(attrib)}>{self.newl}")
+        self._tags.append(tag)
+
+    def end(self):
+        tag = self._tags.pop()
+        self.f.write(f"{self.indent * len(self._tags)}</{tag}>{self.newl}")
+
+    def element(self, tag, text, attrib=None):
+        text = escape(str(text), _QUOTE)
+        self.f.write(f"{self.indent * len(self._tags)}<{tag}{_attrs(attrib)}>{text}</{tag}>{self.newl}")
+
+    def start_activity(self, activity_id, sport="Running"):
+        self.declaration()
+        self.start("TrainingCenterDatabase", TCD_ATTRIB)
+        self.start("Activities")
+        self.start("Activity", {"Sport": sport})
+        self.element("Id", format_time(activity_id))
+
+    def start_lap(self, start_time, total_time, distance, calories, speed, max_speed=None, trigger="Manual"):
+        self.start("Lap", {"StartTime": format_time(start_time)})
+        self.element("TotalTimeSeconds", total_time)
+        self.element("DistanceMeters", distance)
+        if max_speed is not None:
+            self.element("MaximumSpeed", max_speed)
+        self.element("Calories", calories)
+        self.element("Intensity", "Active")
+        self.element("TriggerMethod", trigger)
+        self.start("Track")
+        # 按 TCX 的 XSD，Lap 的 Extensions 必须放在 Track 之后，在 end_lap 里写出
+        self._lap_speed = speed
+
+    def trackpoint(self, time, lat, lon, alt, distance, sensors=""):
+        # 单个 Trackpoint 直接拼成一段字符串写出，避免逐元素调用
+        i0 = self.indent * len(self._tags)
+        i1 = i0 + self.indent
+        i2 = i1 + self.indent
+        n = self.newl
+        self.f.write(
+            f"{i0}<Trackpoint>{n}"
+            f"{i1}<Time>{format_time(time)}</Time>{n}"
+            f"{i1}<Position>{n}"
+            f"{i2}<LatitudeDegrees>{lat}</LatitudeDegrees>{n}"
+            f"{i2}<LongitudeDegrees>{lon}</LongitudeDegrees>{n}"
+            f"{i1}</Position>{n}"
+            f"{i1}<AltitudeMeters>{alt}</AltitudeMeters>{n}"
+            f"{i1}<DistanceMeters>{distance}</DistanceMeters>{n}"
+            f"{sensors}"
+            f"{i0}</Trackpoint>{n}"
+        )
+
+    def sensors(self, heart_rate=None, cadence=None, speed=None):
+        # 可选的传感器通道，写在 DistanceMeters 之后、</Trackpoint> 之前
+        i1 = self.indent * (len(self._tags) + 1)
+        i2 = i1 + self.indent
+        i3 = i2 + self.indent
+        n = self.newl
+        parts = []
+        if heart_rate is not None:
+            parts.append(f"{i1}<HeartRateBpm>{n}{i2}<Value>{heart_rate}</Value>{n}{i1}</HeartRateBpm>{n}")
+        if cadence is not None:
+            parts.append(f"{i1}<Cadence>{cadence}</Cadence>{n}")
+        if speed is not None or cadence is not None:
+            parts.append(f"{i1}<Extensions>{n}{i2}<TPX{_attrs(TPX_ATTRIB)}>{n}")
+            if speed is not None:
+                parts.append(f"{i3}<Speed>{speed}</Speed>{n}")
+            if cadence is not None:
+                parts.append(f"{i3}<RunCadence>{cadence}</RunCadence>{n}")
+            parts.append(f"{i2}</TPX>{n}{i1}</Extensions>{n}")
+        return "".join(parts)
+
+    def track(self, track):
+        channels = track.sensor_channels()
+        if not channels:
+            for row in track.rows():
+                self.trackpoint(*row)
+            return len(track)
+
+        columns = [getattr(track, name).tolist() for name in channels]
+        for row, values in zip(track.rows(), zip(*columns)):
+            self.trackpoint(*row, sensors=self.sensors(**dict(zip(channels, values))))
+        return len(track)
+
+    def end_lap(self):
+        self.end()  # Track
+        self.start("Extensions")
+        self.start("TPX", TPX_ATTRIB)
+        self.element("Speed", self._lap_speed)
+        self.end()
+        self.end()
+        self.end()  # Lap
+
+    def end_activity(self):
+        while self._tags:
+            self.end()
+
+
+def write_activity(f, track, start_time, total_distance, total_time, indent="   ", laps=None):
+    # track 可以是一个 Track，也可以是按块生成的 Track 序列；返回写入的点数
+    # laps 为 LapAggregator 时自动分圈；不分圈时整个活动为一圈。每圈的统计都由轨迹算出，
+    # total_distance / total_time 只是生成轨迹时的目标，不直接写入
+    chunks = [track] if hasattr(track, "rows") else track
+    if laps is None:
+        laps = LapAggregator()
+    writer = TCXWriter(f, indent=indent)
+    writer.start_activity(start_time)
+    count = 0
+    # 一圈结束时才写出，内存里只有当前这一圈
+    for summary, pieces in laps.split(chunks, start_time):
+        writer.start_lap(summary["start_time"], summary["total_time"], summary["distance"], summary["calories"],
+                         summary["speed"], max_speed=summary["max_speed"], trigger=laps.trigger)
+        count += sum(writer.track(piece) for piece in pieces)
+        writer.end_lap()
+    writer.end_activity()
+    return count
@@ -0,0 +1,239 @@
+import hashlib
+import os
+import zipfile
+from functools import lru_cache
+
+import numpy as np
+
+from .geodesy import haversine, segment_lengths
+from .metrics import NULL_METRICS
+
+# 默认路线：操场一圈，首尾相连
+DEFAULT_ROUTE = [
+    (39.084861, 121.808194, 96.0), # 下顶点
+    (39.084997, 121.807718, 96.0), # 左下
+    (39.085528, 121.807667, 96.0), # 左中点
+    (39.086046, 121.807723, 96.0), # 左上
+    (39.086250, 121.808194, 96.0), # 上顶点
+    (39.086046, 121.808603, 96.0), # 右上
+    (39.085556, 121.808667, 96.0), # 右中点
+    (39.085005, 121.808587, 96.0), # 右下
+    (39.084861, 121.808194, 96.0)  # 回到下顶点
+]
+
+
+def interpolate_points(points, num_intervals):
+    points = np.asarray(points, dtype=np.float64)
+    x = np.linspace(0, len(points) - 1, num_intervals)
+    xp = np.arange(len(points))
+    return (np.interp(x, xp, points[:, 0]),
+            np.interp(x, xp, points[:, 1]),
+            np.interp(x, xp, points[:, 2]))
+
+
+def cumulative_distance(lat, lon):
+    distance = np.zeros(len(lat))
+    if len(lat) > 1:
+        np.cumsum(segment_lengths(lat, lon), out=distance[1:])
+    return distance
+
+
+def time_offsets(n, interval):
+    # 与 timedelta(seconds=i * interval) 一样按微秒取整
+    return np.round(np.arange(n) * interval * 1e6).astype("timedelta64[us]")
+
+
+# 可选的传感器通道，未生成时为 None
+SENSOR_CHANNELS = ("heart_rate", "cadence", "speed")
+
+
+class Track:
+    """一次活动的全部轨迹点，各通道都是等长的连续数组。"""
+
+    def __init__(self, lat, lon, alt, time, distance, heart_rate=None, cadence=None, speed=None):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.alt = np.ascontiguousarray(alt, dtype=np.float64)
+        self.time = np.asarray(time, dtype="datetime64[us]")
+        self.distance = np.ascontiguousarray(distance, dtype=np.float64)
+        self.heart_rate = None if heart_rate is None else np.ascontiguousarray(heart_rate, dtype=np.int64)
+        self.cadence = None if cadence is None else np.ascontiguousarray(cadence, dtype=np.int64)
+        self.speed = None if speed is None else np.ascontiguousarray(speed, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, index):
+        return Track(self.lat[index], self.lon[index], self.alt[index], self.time[index], self.distance[index],
+                     **{name: getattr(self, name)[index] for name in self.sensor_channels()})
+
+    def sensor_channels(self):
+        return [name for name in SENSOR_CHANNELS if getattr(self, name) is not None]
+
+    def time_strings(self):
+        return np.char.add(np.datetime_as_string(self.time, unit="s"), "Z")
+
+    def rows(self):
+        # 只在序列化时才逐点转换成 Python 对象
+        return zip(self.time_strings().tolist(), self.lat.tolist(), self.lon.tolist(),
+                   self.alt.tolist(), self.distance.tolist())
+
+
+def concat_tracks(tracks):
+    tracks = list(tracks)
+    channels = {name: np.concatenate([getattr(t, name) for t in tracks])
+                for name in tracks[0].sensor_channels()}
+    return Track(*(np.concatenate([getattr(t, name) for t in tracks])
+                   for name in ("lat", "lon", "alt", "time", "distance")), **channels)
+
+
+# 首尾相距不超过这个距离（米）的路线视为环线，跑回起点接着下一圈；更远的按原路折返
+CLOSE_GAP = 50.0
+
+
+class RouteTemplate:
+    """一圈路线插值后的位置和分段长度，所有活动共用。
+
+    按距离取位置时循环的是 loop_*：首尾已重合的环线就是路线本身，首尾相距不远时补上回到起点的一段，
+    不闭合的路线跑到终点后原路返回。lap_length 为循环一次的长度。
+    """
+
+    def __init__(self, lat, lon, alt):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.alt = np.ascontiguousarray(alt, dtype=np.float64)
+        self.segment_lengths = segment_lengths(self.lat, self.lon)
+        self.arc_length = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+
+        gap = float(haversine(self.lat[-1], self.lon[-1], self.lat[0], self.lon[0]))
+        self.out_and_back = gap > CLOSE_GAP
+        if self.out_and_back:
+            back = slice(-2, None, -1)
+            length = self.arc_length[-1]
+            self.loop_arc = np.concatenate((self.arc_length, 2 * length - self.arc_length[back]))
+            self.loop_lat, self.loop_lon, self.loop_alt = (np.concatenate((a, a[back]))
+                                                           for a in (self.lat, self.lon, self.alt))
+        elif gap > 0:
+            self.loop_arc = np.append(self.arc_length, self.arc_length[-1] + gap)
+            self.loop_lat, self.loop_lon, self.loop_alt = (np.append(a, a[0]) for a in (self.lat, self.lon, self.alt))
+        else:
+            self.loop_arc, self.loop_lat, self.loop_lon, self.loop_alt = self.arc_length, self.lat, self.lon, self.alt
+        self.lap_length = float(self.loop_arc[-1])
+        for a in (self.lat, self.lon, self.alt, self.segment_lengths, self.arc_length,
+                  self.loop_arc, self.loop_lat, self.loop_lon, self.loop_alt):
+            a.flags.writeable = False
+
+    def __len__(self):
+        return len(self.lat)
+
+    def tile(self, n):
+        # 只复制需要的圈数，返回可写的副本
+        reps = -(-n // len(self))
+        return (np.tile(self.lat, reps)[:n], np.tile(self.lon, reps)[:n], np.tile(self.alt, reps)[:n])
+
+    def at_distance(self, distance):
+        # 按沿路线的累计距离取位置，超过一圈时从起点继续
+        d = np.mod(distance, self.lap_length)
+        return (np.interp(d, self.loop_arc, self.loop_lat),
+                np.interp(d, self.loop_arc, self.loop_lon),
+                np.interp(d, self.loop_arc, self.loop_alt))
+
+
+def route_key(points, num_intervals):
+    data = np.asarray(points, dtype=np.float64).tobytes() + str(num_intervals).encode()
+    return hashlib.sha1(data).hexdigest()
+
+
+def route_template(points, num_intervals, cache_dir=None):
+    if isinstance(points, RouteTemplate):
+        return points
+    return _route_template(tuple(map(tuple, points)), num_intervals, cache_dir)
+
+
+@lru_cache(maxsize=64)
+def _route_template(points, num_intervals, cache_dir):
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"route_{route_key(points, num_intervals)}.npz")
+        try:
+            with np.load(path) as data:
+                return RouteTemplate(data["lat"], data["lon"], data["alt"])
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # 不存在或读不出来（例如以前被打断时留下的半个文件）都当作未命中，重新生成
+            pass
+
+    lat, lon, alt = interpolate_points(points, num_intervals)
+    if path is not None:
+        # sinks 依赖本模块，在这里才导入；先写临时文件再 rename，多个进程同时写也不会读到半个文件
+        from .sinks import atomic_open
+        os.makedirs(cache_dir, exist_ok=True)
+        with atomic_open(path, "wb") as f:
+            np.savez(f, lat=lat, lon=lon, alt=alt)
+    return RouteTemplate(lat, lon, alt)
+
+
+# 相邻两点至少相隔的秒数。TCX / FIT 的时间只到整秒，更近的两点会得到相同的时间
+MIN_STEP = 1.0
+
+
+def track_chunks(points, start_time, total_time=None, total_distance=None, speed=None, interval=1.0,
+                 chunk_size=4096, cache_dir=None, metrics=None):
+    # 按需逐块生成轨迹，每块最多 chunk_size 个点；路线按需要循环，
+    # 到达 total_time 或 total_distance（先到者为准）时正好停在目标上。
+    # 每块多算一个点、不结束时丢掉，终点总在算出它前一个点的那一块里确定；
+    # 终点之前不到 MIN_STEP 秒的常规点并入终点。按距离在路线上插值的用时记到 metrics 的 interpolate 阶段
+    if total_time is None and total_distance is None:
+        raise ValueError("需要指定 total_time 或 total_distance")
+    if speed is None:
+        if total_time is None or total_distance is None:
+            raise ValueError("未指定配速时需要同时给出 total_time 和 total_distance")
+        speed = total_distance / total_time
+
+    metrics = metrics or NULL_METRICS
+    template = route_template(points, len(points), cache_dir)
+    start = np.datetime64(start_time, "us")
+    t_end = np.inf if total_time is None else float(total_time)
+    d_end = np.inf if total_distance is None else float(total_distance)
+
+    i = 0
+    last_t, last_speed, last_d = None, 0.0, 0.0
+    while True:
+        done = False
+        t = np.arange(i, i + chunk_size + 1) * interval
+        if t[-1] > t_end - MIN_STEP:
+            keep = t <= t_end - MIN_STEP
+            keep[0] |= i == 0  # 活动的第一个点总是保留
+            t = np.append(t[keep], t_end)
+            done = True
+        s = speed(t) if callable(speed) else np.full(len(t), float(speed))
+        s = np.asarray(s, dtype=np.float64)
+
+        # 每一步按上一个点的速度前进
+        dt = np.diff(t, prepend=t[0] if last_t is None else last_t)
+        d = last_d + np.cumsum(np.concatenate(([last_speed], s[:-1])) * dt)
+
+        if d[-1] >= d_end:
+            k = int(np.searchsorted(d, d_end))
+            t_prev = t[k - 1] if k > 0 else last_t
+            d_prev = d[k - 1] if k > 0 else last_d
+            t, d = t[:k + 1].copy(), d[:k + 1].copy()
+            if t_prev is not None and d[k] > d_prev:
+                # 线性插出到达目标距离的时刻
+                t[k] = t_prev + (d_end - d_prev) / (d[k] - d_prev) * (t[k] - t_prev)
+            d[k] = d_end
+            # 插出的时刻带有累加的舍入误差，留一点余量，免得结果随分块方式变化
+            if (k > 1 or (k == 1 and i > 0)) and t[k] - t[k - 1] < MIN_STEP - 1e-6:
+                t, d = np.delete(t, k - 1), np.delete(d, k - 1)
+            done = True
+        elif not done:
+            t, s, d = t[:-1], s[:-1], d[:-1]
+
+        with metrics.stage("interpolate"):
+            lat, lon, alt = template.at_distance(d)
+        time = start + np.round(t * 1e6).astype("timedelta64[us]")
+        yield Track(lat, lon, alt, time, d)
+
+        if done:
+            return
+        i += chunk_size
+        last_t, last_speed, last_d = t[-1], s[-1], d[-1]
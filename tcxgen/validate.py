@@ -0,0 +1,261 @@
+import glob
+import gzip
+import os
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+import numpy as np
+
+from .geodesy import segment_lengths
+from .tcxreader import read_tcx
+
+TCD_NS = "{http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2}"
+
+# TCX v2 XSD 中活动相关的部分：元素 -> [(子元素, 最少次数, 最多次数)]，按 xsd:sequence 的顺序
+SEQUENCES = {
+    "TrainingCenterDatabase": [("Folders", 0, 1), ("Activities", 0, 1), ("Workouts", 0, 1), ("Courses", 0, 1),
+                               ("Author", 0, 1), ("Extensions", 0, 1)],
+    "Activities": [("Activity", 0, None), ("MultiSportSession", 0, None)],
+    "Activity": [("Id", 1, 1), ("Lap", 1, None), ("Notes", 0, 1), ("Training", 0, 1), ("Creator", 0, 1),
+                 ("Extensions", 0, 1)],
+    "Lap": [("TotalTimeSeconds", 1, 1), ("DistanceMeters", 1, 1), ("MaximumSpeed", 0, 1), ("Calories", 1, 1),
+            ("AverageHeartRateBpm", 0, 1), ("MaximumHeartRateBpm", 0, 1), ("Intensity", 1, 1), ("Cadence", 0, 1),
+            ("TriggerMethod", 1, 1), ("Track", 0, None), ("Notes", 0, 1), ("Extensions", 0, 1)],
+    "Trackpoint": [("Time", 1, 1), ("Position", 0, 1), ("AltitudeMeters", 0, 1), ("DistanceMeters", 0, 1),
+                   ("HeartRateBpm", 0, 1), ("Cadence", 0, 1), ("SensorState", 0, 1), ("Extensions", 0, 1)],
+    "Position": [("LatitudeDegrees", 1, 1), ("LongitudeDegrees", 1, 1)],
+    "HeartRateBpm": [("Value", 1, 1)],
+    "AverageHeartRateBpm": [("Value", 1, 1)],
+    "MaximumHeartRateBpm": [("Value", 1, 1)],
+}
+ENUMS = {"Intensity": {"Active", "Resting"}, "TriggerMethod": {"Manual", "Distance", "Location", "Time", "HeartRate"},
+         "SensorState": {"Present", "Absent"}}
+# 必需的属性，值为 None 时不限取值
+ATTRIBUTES = {"Activity": {"Sport": {"Running", "Biking", "Other"}}, "Lap": {"StartTime": None}}
+# 读不出来的文件：XML 语法错误、时间等取值无效、文件不可读，以及被截断（EOFError）或损坏（zlib.error）的 .gz
+READ_ERRORS = (ET.ParseError, ValueError, OSError, EOFError, zlib.error)
+
+
+class Problems:
+    """一个文件的检查结果：每类问题的次数和第一条说明。"""
+
+    def __init__(self):
+        self.items = {}
+
+    def add(self, check, message, count=1):
+        if check in self.items:
+            self.items[check][0] += count
+        else:
+            self.items[check] = [count, message]
+
+    def as_dict(self):
+        return {check: {"count": count, "first": message} for check, (count, message) in self.items.items()}
+
+
+class StructureChecker:
+    """随 read_tcx 流式检查元素顺序、出现次数、枚举值和必需属性。
+
+    Extensions 内部（xsd:any）和其它命名空间的元素不检查。Track 的轨迹点在读取时
+    就被清除，所以单独计数。
+    """
+
+    # 完整标签 -> 元素名，只包含需要检查的元素；序列规则预先换成 {完整标签: 位置}
+    _NAMES = {TCD_NS + name: name for name in {*SEQUENCES, *ENUMS, *ATTRIBUTES, "Track"}}
+    _ORDERS = {name: {TCD_NS + child: j for j, (child, _, _) in enumerate(sequence)}
+               for name, sequence in SEQUENCES.items()}
+
+    def __init__(self, problems):
+        self.problems = problems
+        self._trackpoints = 0
+
+    def start(self, elem, stack):
+        if not stack and elem.tag != TCD_NS + "TrainingCenterDatabase":
+            self.problems.add("structure", f"根元素应为 TrainingCenterDatabase（TCX v2 命名空间），实际为 {elem.tag}")
+
+    def end(self, elem, parent):
+        name = self._NAMES.get(elem.tag)
+        if name is None:
+            return
+        if name == "Trackpoint":
+            self._trackpoints += 1
+        elif name == "Track":
+            if self._trackpoints == 0:
+                self.problems.add("structure", "Track 中没有 Trackpoint")
+            self._trackpoints = 0
+        if name in ENUMS and (elem.text or "").strip() not in ENUMS[name]:
+            self.problems.add("structure", f"{name} 的取值 {elem.text!r} 不在 {sorted(ENUMS[name])} 中")
+        for attr, allowed in ATTRIBUTES.get(name, {}).items():
+            value = elem.get(attr)
+            if value is None or (allowed is not None and value not in allowed):
+                self.problems.add("structure", f"{name} 缺少属性 {attr} 或取值 {value!r} 无效")
+        if name in SEQUENCES:
+            self._sequence(name, elem)
+
+    def _sequence(self, name, elem):
+        sequence = SEQUENCES[name]
+        order = self._ORDERS[name]
+        counts = [0] * len(sequence)
+        pos = 0
+        for child in elem:
+            j = order.get(child.tag)
+            if j is None or j < pos:
+                child_name = child.tag[len(TCD_NS):] if child.tag.startswith(TCD_NS) else child.tag
+                self.problems.add("structure", f"{name} 中的 {child_name} 不允许出现或顺序不对")
+                continue
+            pos = j
+            counts[j] += 1
+        for (child_name, low, high), count in zip(sequence, counts):
+            if count < low:
+                self.problems.add("structure", f"{name} 缺少 {child_name}")
+            elif high is not None and count > high:
+                self.problems.add("structure", f"{name} 中 {child_name} 出现了 {count} 次")
+
+
+def _report(problems, check, mask, message):
+    # mask 为按步（相邻两点）的布尔数组，记录次数和第一处的位置
+    count = int(np.count_nonzero(mask))
+    if count:
+        i = int(np.argmax(mask))
+        problems.add(check, message(i), count)
+
+
+def check_track(track, laps, problems, max_speed=12.5, max_accel=8.0, tolerance=0.005, time_tolerance=1.5,
+                distance_tolerance=1.0):
+    # 轨迹和分圈的物理合理性与内部一致性，全部用数组运算
+    n = len(track)
+    if n == 0:
+        problems.add("empty", "没有轨迹点")
+        return
+
+    missing = np.isnat(track.time)
+    _report(problems, "time_missing", missing, lambda i: f"第 {i} 个点没有时间")
+    index = np.nonzero(~missing)[0]
+    t = track.time[index].astype(np.int64) / 1e6
+    d = track.distance[index]
+    dt, dd = np.diff(t), np.diff(d)
+
+    _report(problems, "time_order", dt < 0, lambda i: f"第 {index[i + 1]} 个点的时间早于前一个点")
+    _report(problems, "time_repeat", dt == 0, lambda i: f"第 {index[i + 1]} 个点与前一个点时间相同")
+    _report(problems, "distance_order", dd < -1e-3, lambda i: f"第 {index[i + 1]} 个点的 DistanceMeters 比前一个点小")
+    bad_position = (np.abs(track.lat) > 90) | (np.abs(track.lon) > 180)
+    _report(problems, "position", bad_position, lambda i: f"第 {i} 个点的经纬度超出范围")
+
+    moving = dt > 0
+    steps = np.nonzero(moving)[0]
+    speed = dd[moving] / dt[moving]
+    _report(problems, "speed", speed > max_speed,
+            lambda i: f"第 {index[steps[i] + 1]} 个点按 DistanceMeters 的速度 {speed[i]:.1f} m/s 超过 {max_speed}")
+    position_speed = segment_lengths(track.lat[index], track.lon[index])[moving] / dt[moving]
+    _report(problems, "position_jump", position_speed > max_speed,
+            lambda i: f"第 {index[steps[i] + 1]} 个点按位置的速度 {position_speed[i]:.1f} m/s 超过 {max_speed}")
+    accel = np.diff(speed) / dt[moving][1:]
+    _report(problems, "acceleration", np.abs(accel) > max_accel,
+            lambda i: f"第 {index[steps[i + 1] + 1]} 个点的加速度 {accel[i]:.1f} m/s² 超过 {max_accel}")
+
+    # 每圈的时间、距离与轨迹点一致：一圈从它的第一个点到下一圈的第一个点（最后一圈到最后一个点）
+    laps = [lap for lap in laps if lap.get("points")]
+    if not laps:
+        return
+    first = np.array([lap["first_point"] for lap in laps])
+    end = np.minimum(first + np.array([lap["points"] for lap in laps]), n - 1)
+    seconds = track.time.astype(np.int64) / 1e6
+    seconds[missing] = np.nan
+    start = np.array([lap["start_time"] for lap in laps], dtype="datetime64[us]")
+    start_seconds = np.where(np.isnat(start), np.nan, start.astype(np.int64) / 1e6)
+    total_time = np.array([lap["total_time"] for lap in laps])
+    distance = np.array([lap["distance"] for lap in laps])
+    span_time = seconds[end] - seconds[first]
+    span_distance = track.distance[end] - track.distance[first]
+
+    _report(problems, "lap_start", np.abs(start_seconds - seconds[first]) > 1.0,
+            lambda i: f"第 {i + 1} 圈的 StartTime 与第一个轨迹点相差 {start_seconds[i] - seconds[first[i]]:.0f} 秒")
+    _report(problems, "lap_time",
+            np.abs(total_time - span_time) > np.maximum(time_tolerance, tolerance * total_time),
+            lambda i: f"第 {i + 1} 圈 TotalTimeSeconds 为 {total_time[i]:.1f}，轨迹点跨度为 {span_time[i]:.1f}")
+    _report(problems, "lap_distance",
+            np.abs(distance - span_distance) > np.maximum(distance_tolerance, tolerance * distance),
+            lambda i: f"第 {i + 1} 圈 DistanceMeters 为 {distance[i]:.1f}，轨迹点累计为 {span_distance[i]:.1f}")
+
+
+@lru_cache(maxsize=None)
+def load_schema(xsd):
+    try:
+        from lxml import etree
+    except ImportError:
+        raise ValueError("按 XSD 文件完整校验需要安装 lxml") from None
+    return etree.XMLSchema(etree.parse(xsd))
+
+
+def validate_file(path, xsd=None, **limits):
+    """检查一个 TCX（或 .tcx.gz）文件，返回 {"path", "points", "laps", "problems"}。
+
+    limits 传给 check_track。给出 xsd 时另外用 lxml 按该 XSD 文件完整校验一遍。
+    """
+    problems = Problems()
+    result = {"path": path, "points": 0, "laps": 0}
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rb") as f:
+            track, laps = read_tcx(f, checker=StructureChecker(problems))
+    except READ_ERRORS as e:
+        problems.add("parse", f"{type(e).__name__}: {e}")
+    else:
+        result["points"], result["laps"] = len(track), len(laps)
+        check_track(track, laps, problems, **limits)
+
+    if xsd is not None:
+        schema = load_schema(xsd)
+        from lxml import etree
+        try:
+            with opener(path, "rb") as f:
+                document = etree.parse(f)
+        except (etree.XMLSyntaxError, *READ_ERRORS) as e:
+            # 一个文件读不出来只记为该文件的问题，不中断整批检查
+            problems.add("xsd", f"{type(e).__name__}: {e}")
+        else:
+            if not schema.validate(document):
+                problems.add("xsd", str(schema.error_log.last_error), len(schema.error_log))
+
+    result["problems"] = problems.as_dict()
+    return result
+
+
+def find_files(paths, pattern="*.tcx"):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", pattern), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def validate_paths(paths, pattern="*.tcx", workers=None, **options):
+    # 文件和目录（递归匹配 pattern）并行检查，结果顺序与文件顺序一致
+    files = find_files(paths, pattern)
+    if not files:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(validate_file, **options), files, chunksize=max(1, len(files) // 64)))
+
+
+def summarize(results):
+    summary = {"files": len(results), "failed": 0, "points": 0, "problems": {}}
+    for result in results:
+        summary["points"] += result["points"]
+        if result["problems"]:
+            summary["failed"] += 1
+        for check, item in result["problems"].items():
+            total = summary["problems"].setdefault(check, {"files": 0, "count": 0, "example": result["path"]})
+            total["files"] += 1
+            total["count"] += item["count"]
+    return summary
+
+
+def format_summary(summary):
+    lines = [f"{summary['files']} files, {summary['points']} points, {summary['failed']} failed"]
+    for check, total in sorted(summary["problems"].items(), key=lambda item: -item[1]["files"]):
+        lines.append(f"  {check:<16} {total['files']:>7} files {total['count']:>10} times   e.g. {total['example']}")
+    return "\n".join(lines)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from tcxgen.track import Track
+
+START = datetime(2024, 5, 1, 10, 3, 32)
+
+
+@pytest.fixture
+def start_time():
+    return START
+
+
+@pytest.fixture
+def make_track(start_time):
+    """生成测试用轨迹的工厂：n 个点，每 interval 秒一个点、每秒 2.5 米，位置在操场附近随机分布。"""
+
+    def make(n=200, sensors=False, interval=1.0, seed=0):
+        rng = np.random.default_rng(seed)
+        time = np.datetime64(start_time, "us") + np.round(np.arange(n) * interval * 1e6).astype("timedelta64[us]")
+        channels = {}
+        if sensors:
+            channels = {"heart_rate": rng.integers(120, 180, n), "cadence": rng.integers(80, 95, n),
+                        "speed": rng.uniform(2, 3, n)}
+        return Track(39.0848 + rng.uniform(0, 1e-3, n), 121.8081 + rng.uniform(0, 1e-3, n),
+                     96 + rng.uniform(0, 3, n), time, np.arange(n) * 2.5 * interval, **channels)
+
+    return make
@@ -0,0 +1,69 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from tcxgen.batch import INDEX_FILE, date_range_tasks, run_batch
+from tcxgen.sinks import atomic_open
+from tcxgen.tcxreader import read_tcx
+
+
+def test_incremental_skips_up_to_date_files(tmp_path, capsys):
+    tasks, _ = date_range_tasks(datetime(2024, 4, 17), 4, seed=1)
+    run_batch(tasks, str(tmp_path), workers=0, interval=5.0)
+    with open(tmp_path / INDEX_FILE) as f:
+        index = json.load(f)
+    assert sorted(index.values()) == ["4_17.tcx", "4_18.tcx", "4_19.tcx", "4_20.tcx"]
+
+    capsys.readouterr()
+    files, _, _ = run_batch(tasks, str(tmp_path), workers=0, incremental=True, interval=5.0)
+    assert files == 0 and "4 files up to date" in capsys.readouterr().out
+
+    # 选项变了：同名文件重新生成，旧键作废
+    files, _, _ = run_batch(tasks[:2], str(tmp_path), workers=0, incremental=True, interval=4.0)
+    with open(tmp_path / INDEX_FILE) as f:
+        updated = json.load(f)
+    assert files == 2 and len(updated) == 4 and sorted(updated.values()) == sorted(index.values())
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("options", [{}, {"lap_distance": 1000}, {"interval": 1.0, "sensors": True}])
+def test_default_batch_covers_the_requested_distance(tmp_path, options):
+    # 圈统计取自轨迹，轨迹本身要正好跑完随机出的距离和用时
+    tasks, _ = date_range_tasks(datetime(2024, 4, 17), 5, seed=1)
+    run_batch(tasks, str(tmp_path), workers=0, **options)
+    for _, date, _, total_distance, total_time, _ in tasks:
+        points, laps = read_tcx(str(tmp_path / f"{date.month}_{date.day}.tcx"))
+        distance = sum(lap["distance"] for lap in laps)
+        assert 3020 <= distance <= 3230 and distance == pytest.approx(total_distance)
+        assert 1500 <= sum(lap["total_time"] for lap in laps) <= 1800
+        assert points.distance[-1] == pytest.approx(total_distance)
+        seconds = (points.time[-1] - points.time[0]) / np.timedelta64(1, "s")
+        assert abs(seconds - total_time) < 1  # TCX 的时间只到整秒
+
+
+def test_atomic_open_keeps_the_original_error(tmp_path):
+    with pytest.raises(FileNotFoundError) as excinfo:
+        with atomic_open(str(tmp_path / "missing" / "out.tcx")):
+            pass
+    assert excinfo.value.__context__ is None
+
+
+def test_atomic_open_leaves_no_partial_file(tmp_path):
+    path = tmp_path / "out.txt"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_open(str(path)) as f:
+            f.write("new")
+            raise RuntimeError
+    assert path.read_text() == "old" and os.listdir(tmp_path) == ["out.txt"]
+
+
+def test_generator_version_invalidates_index(tmp_path, monkeypatch):
+    tasks, _ = date_range_tasks(datetime(2024, 4, 17), 2, seed=1)
+    run_batch(tasks, str(tmp_path), workers=0, interval=5.0)
+    monkeypatch.setattr("tcxgen.batch.GENERATOR_VERSION", "test")
+    files, _, _ = run_batch(tasks, str(tmp_path), workers=0, incremental=True, interval=5.0)
+    assert files == 2
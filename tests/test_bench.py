@@ -0,0 +1,12 @@
+from tcxgen.bench import STAGES, bench_once
+
+
+def test_bench_reports_every_pipeline_stage(tmp_path):
+    result = bench_once(2000, str(tmp_path), sensors=True)
+    assert result["interval"] == 2.056 and result["points"] == 2001
+    for name in STAGES:
+        if name != "dem":
+            assert result[f"{name}_s"] > 0, name
+    stages = sum(result[f"{name}_s"] for name in STAGES)
+    assert stages <= result["total_s"]
+    assert result["bytes"] == (tmp_path / "bench_2000.tcx").stat().st_size
@@ -0,0 +1,21 @@
+import pytest
+
+from tcxgen.cli import main
+from tcxgen.tcxreader import read_tcx
+
+
+@pytest.mark.parametrize("extra", [[], ["--interval", "1"]])
+def test_generate_honors_distance_and_duration(tmp_path, extra):
+    out = tmp_path / "g.tcx"
+    main(["generate", "--date", "2024-05-01", "--distance", "10000", "--duration", "3600", "--out", str(out), *extra])
+    _, (lap,) = read_tcx(str(out))
+    assert lap["distance"] == pytest.approx(10000.0) and lap["total_time"] == pytest.approx(3600.0)
+
+
+def test_config_distance_range_is_used(tmp_path):
+    config = tmp_path / "tcxgen.toml"
+    config.write_text("seed = 1\ndistance_range = [8000, 8001]\nduration_range = [3000, 3001]\n")
+    out = tmp_path / "g.tcx"
+    main(["generate", "--config", str(config), "--date", "2024-05-01", "--out", str(out)])
+    _, (lap,) = read_tcx(str(out))
+    assert 8000 <= lap["distance"] <= 8001 and 3000 <= lap["total_time"] <= 3001
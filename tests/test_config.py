@@ -0,0 +1,27 @@
+import pytest
+
+from tcxgen.cli import main
+
+
+def run_with_config(tmp_path, text, *argv):
+    path = tmp_path / "tcxgen.toml"
+    path.write_text(text)
+    return main(["batch", "--config", str(path), "--start", "2024-04-17", "--days", "1",
+                 "--out", str(tmp_path / "out"), "--workers", "0", *argv])
+
+
+@pytest.mark.parametrize("text", ["seeed = 3\n", "[bacth]\ndays = 1\n", "[batch]\nsizes = [1000]\n"])
+def test_unknown_keys_are_rejected(tmp_path, text):
+    with pytest.raises(SystemExit):
+        run_with_config(tmp_path, text)
+
+
+def test_conflicting_lap_options_are_rejected(tmp_path):
+    with pytest.raises(SystemExit):
+        run_with_config(tmp_path, "[batch]\nlap_distance = 1000\nlap_per_loop = true\n")
+
+
+def test_command_line_overrides_exclusive_config(tmp_path):
+    run_with_config(tmp_path, "seed = 3\nsizes = [1000]\n[batch]\nlap_distance = 1000\n", "--lap-per-loop")
+    text = (tmp_path / "out" / "4_17.tcx").read_text()
+    assert "<TriggerMethod>Location</TriggerMethod>" in text and ">Distance<" not in text
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from tcxgen.elevation import DEM, VOID, tile_name
+from tcxgen.track import Track
+
+SIZE = 1201  # SRTM3
+
+
+@pytest.fixture
+def dem_dir(tmp_path):
+    # 第 r 行第 c 列的高程为 r + 2c，第一行是北边；(600, 600) 为空洞
+    rows, cols = np.mgrid[0:SIZE, 0:SIZE]
+    data = (rows + 2 * cols).astype(">i2")
+    data[600, 600] = VOID
+    data.tofile(tmp_path / tile_name(39, 121))
+    data.tofile(tmp_path / tile_name(40, 121))
+    return tmp_path
+
+
+def test_corners(dem_dir):
+    dem = DEM(str(dem_dir))
+    # 西北角是第一行第一列，西南角是最后一行，东南角是最后一行最后一列
+    lookup = dem.lookup([39.999999999, 39.0, 39.0], [121.0, 121.0, 121.999999999])
+    np.testing.assert_allclose(lookup, [0, 1200, 1200 + 2 * 1200], atol=1e-5)
+
+
+def test_bilinear_midpoint(dem_dir):
+    dem = DEM(str(dem_dir))
+    # 第 10、11 行与第 20、21 列四个格点的中间
+    lat, lon = 40 - 10.5 / 1200, 121 + 20.5 / 1200
+    expected = np.mean([10 + 40, 10 + 42, 11 + 40, 11 + 42])
+    assert dem.lookup([lat], [lon])[0] == pytest.approx(expected)
+    # 沿一行线性变化
+    assert dem.lookup([40 - 10 / 1200], [121 + 20.25 / 1200])[0] == pytest.approx(10 + 40.5)
+
+
+def test_void_and_missing_tile_keep_original_altitude(dem_dir):
+    dem = DEM(str(dem_dir))
+    lat = np.array([40 - 600 / 1200, 39.25, 45.5])
+    lon = np.array([121 + 600 / 1200, 121.5, 121.5])
+    alt = dem.lookup(lat, lon)
+    assert np.isnan(alt[0]) and np.isnan(alt[2])
+    assert alt[1] == pytest.approx(900 + 2 * 600)
+
+    time = np.datetime64("2024-05-01T10:00:00", "us") + np.arange(3).astype("timedelta64[s]")
+    track = dem.apply(Track(lat, lon, [96.0, 96.0, 97.0], time, [0.0, 1.0, 2.0]))
+    assert track.alt[0] == 96.0 and track.alt[2] == 97.0 and track.alt[1] == alt[1]
+
+
+def test_tiles_are_evicted_least_recently_used_first(dem_dir):
+    dem = DEM(str(dem_dir), max_tiles=2)
+    dem.lookup([39.5], [121.5])
+    dem.lookup([40.5], [121.5])
+    dem.lookup([39.5], [121.5])      # 39 最近用过，不会被淘汰
+    dem.lookup([45.5], [121.5])      # 没有瓦片的位置同样占一个缓存位置
+    assert list(dem._tiles) == [(39, 121), (45, 121)]
+    assert dem._tiles[(45, 121)] is None
+    assert dem.tile(39, 121).shape == (SIZE, SIZE)
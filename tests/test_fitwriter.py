@@ -0,0 +1,110 @@
+import io
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from tcxgen.fitwriter import crc16
+from tcxgen.laps import LapAggregator
+from tcxgen.sinks import write_fit, write_tcx
+from tcxgen.tcxreader import read_tcx
+
+FIT_EPOCH = datetime(1989, 12, 31)
+# 基本类型 -> (字节数, struct 格式)，按 FIT SDK 的定义单独列出，不引用被测代码里的表
+BASE_TYPES = {0x00: (1, "B"), 0x02: (1, "B"), 0x84: (2, "H"), 0x85: (4, "i"), 0x86: (4, "I"), 0x8C: (4, "I")}
+FILE_ID, SESSION, LAP, RECORD, ACTIVITY = 0, 18, 19, 20, 34
+
+
+def decode(data):
+    # 最小的 FIT 解码器：检查文件头和 CRC，返回 [(全局消息编号, {字段编号: 值}), ...]
+    header_size, _, _, data_size, tag = struct.unpack("<BBHI4s", data[:12])
+    assert header_size == 14 and tag == b".FIT"
+    assert crc16(data[:12]) == struct.unpack("<H", data[12:14])[0]
+    assert len(data) == header_size + data_size + 2
+    assert crc16(data) == 0  # 末尾的 CRC 覆盖整个文件
+
+    definitions, messages = {}, []
+    pos, end = header_size, header_size + data_size
+    while pos < end:
+        header = data[pos]
+        pos += 1
+        assert header & 0x80 == 0, "不使用压缩时间戳头"
+        local = header & 0x0F
+        if header & 0x40:
+            _, arch, global_num, count = struct.unpack("<BBHB", data[pos:pos + 5])
+            assert arch == 0
+            pos += 5
+            fields = []
+            for _ in range(count):
+                num, size, base = data[pos:pos + 3]
+                assert BASE_TYPES[base][0] == size
+                fields.append((num, BASE_TYPES[base][1]))
+                pos += 3
+            definitions[local] = (global_num, fields)
+        else:
+            global_num, fields = definitions[local]
+            fmt = "<" + "".join(f for _, f in fields)
+            values = struct.unpack(fmt, data[pos:pos + struct.calcsize(fmt)])
+            pos += struct.calcsize(fmt)
+            messages.append((global_num, dict(zip((num for num, _ in fields), values))))
+    return messages
+
+
+def render(track, start_time, laps=None, sink=write_fit):
+    f = io.BytesIO()
+    sink(f, track, start_time, 3020.0, 1579.0, laps=laps)
+    return f.getvalue()
+
+
+def of_type(messages, global_num):
+    return [fields for num, fields in messages if num == global_num]
+
+
+def test_records_round_trip(make_track, start_time):
+    track = make_track(sensors=True)
+    records = of_type(decode(render(track, start_time)), RECORD)
+    assert len(records) == len(track)
+    column = {num: np.array([r[num] for r in records]) for num in records[0]}
+    seconds = (track.time.astype("datetime64[s]") - np.datetime64(FIT_EPOCH, "s")).astype(np.int64)
+    np.testing.assert_array_equal(column[253], seconds)
+    np.testing.assert_allclose(column[0] * 180 / 2 ** 31, track.lat, atol=1e-7)
+    np.testing.assert_allclose(column[1] * 180 / 2 ** 31, track.lon, atol=1e-7)
+    np.testing.assert_allclose(column[2] / 5 - 500, track.alt, atol=0.1)
+    np.testing.assert_allclose(column[5] / 100, track.distance, atol=0.005)
+    np.testing.assert_array_equal(column[3], track.heart_rate)
+    np.testing.assert_array_equal(column[4], track.cadence)
+    np.testing.assert_allclose(column[6] / 1000, track.speed, atol=5e-4)
+
+
+def test_laps_add_up_to_session(make_track, start_time):
+    track = make_track()
+    messages = decode(render(track, start_time, LapAggregator(distance=100)))
+    laps, (session,), (activity,) = of_type(messages, LAP), of_type(messages, SESSION), of_type(messages, ACTIVITY)
+    assert len(of_type(messages, FILE_ID)) == 1
+    assert len(laps) == 5 and session[26] == 5
+    assert sum(lap[9] for lap in laps) == session[9] == round(track.distance[-1] * 100)
+    assert session[7] == activity[0] == 199000
+    assert [lap[24] for lap in laps] == [2] * 5  # lap_trigger = distance
+
+
+def test_empty_track_still_has_a_lap(make_track, start_time):
+    track = make_track(0)
+    messages = decode(render(track, start_time, LapAggregator(distance=100)))
+    assert of_type(messages, RECORD) == []
+    (lap,), (session,) = of_type(messages, LAP), of_type(messages, SESSION)
+    assert lap[7] == 0 and session[26] == 1
+
+    points, laps = read_tcx(io.BytesIO(render(track, start_time, LapAggregator(distance=100), sink=write_tcx)))
+    assert len(points) == 0 and len(laps) == 1
+
+
+def test_single_lap_totals_come_from_track(make_track, start_time):
+    # 不分圈时同样由轨迹算出统计，而不是照抄传入的 3020 米 / 1579 秒
+    track = make_track()
+    (lap,) = of_type(decode(render(track, start_time)), LAP)
+    assert lap[9] == round(track.distance[-1] * 100)
+    assert lap[7] == 199000 and lap[24] == 0
+
+    _, laps = read_tcx(io.BytesIO(render(track, start_time, sink=write_tcx)))
+    assert len(laps) == 1
+    assert laps[0]["distance"] == track.distance[-1] and laps[0]["total_time"] == 199.0
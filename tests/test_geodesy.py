@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from tcxgen.geodesy import LocalFrame, arc, arc_center, equirectangular, haversine, segment_lengths
+
+
+def test_equirectangular_agrees_with_haversine():
+    rng = np.random.default_rng(0)
+    lat1, lon1 = rng.uniform(-60, 60, 500), rng.uniform(-180, 180, 500)
+    # 几公里以内的点对
+    lat2, lon2 = lat1 + rng.uniform(-0.03, 0.03, 500), lon1 + rng.uniform(-0.03, 0.03, 500)
+    np.testing.assert_allclose(equirectangular(lat1, lon1, lat2, lon2), haversine(lat1, lon1, lat2, lon2), rtol=1e-4)
+    assert haversine(39.0, 121.0, 40.0, 121.0) == pytest.approx(111195, rel=1e-4)
+
+
+def test_local_frame_round_trip():
+    frame = LocalFrame(39.0855, 121.8082, 96.0)
+    rng = np.random.default_rng(1)
+    lat, lon, alt = 39.0855 + rng.uniform(-0.01, 0.01, 100), 121.8082 + rng.uniform(-0.01, 0.01, 100), \
+        rng.uniform(80, 110, 100)
+    back = frame.to_geodetic(*frame.to_enu(lat, lon, alt))
+    for a, b in zip(back, (lat, lon, alt)):
+        np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+
+    # 东、北方向各 100 米
+    east, north = frame.to_enu(*frame.to_geodetic(100.0, 0.0))
+    assert (east, north) == pytest.approx((100.0, 0.0))
+    assert haversine(frame.lat0, frame.lon0, *frame.to_geodetic(0.0, 100.0)) == pytest.approx(100.0, rel=1e-3)
+
+
+def test_arc_radius():
+    lat, lon = arc(39.0855, 121.8082, 40.0, 0, 180, 50)
+    np.testing.assert_allclose(haversine(lat, lon, 39.0855, 121.8082), 40.0, rtol=1e-3)
+    # 半圆弧长为 π r
+    assert segment_lengths(lat, lon).sum() == pytest.approx(np.pi * 40.0, rel=1e-3)
+
+
+@pytest.mark.parametrize("sweep", [90, -90, 180, 45])
+def test_arc_center_meets_both_endpoints(sweep):
+    start, end = (39.084861, 121.808194), (39.085556, 121.808667)
+    center_lat, center_lon, radius, a0, a1 = arc_center(*start, *end, sweep)
+    assert a1 - a0 == sweep
+    assert haversine(center_lat, center_lon, *start) == pytest.approx(radius, rel=1e-4)
+    assert haversine(center_lat, center_lon, *end) == pytest.approx(radius, rel=1e-4)
+    lat, lon = arc(center_lat, center_lon, radius, a0, a1, 30)
+    assert haversine(lat[0], lon[0], *start) < 0.01 and haversine(lat[-1], lon[-1], *end) < 0.01
+
+
+def test_legacy_loops_are_continuous():
+    formal_run = pytest.importorskip("formalRun")
+    create_tcx = pytest.importorskip("createTCX")
+    template = formal_run.loop_template(100)
+    steps = segment_lengths(np.append(template.lat, template.lat[0]), np.append(template.lon, template.lon[0]))
+    assert steps.max() < 3 * np.median(steps)
+
+    lat, lon, _ = (np.array(c) for c in zip(*create_tcx.generate_trackpoints(100)))
+    steps = segment_lengths(lat, lon)
+    assert steps.max() < 3 * np.median(steps)
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from tcxgen.geodesy import segment_lengths
+from tcxgen.route import SegmentIndex, load_route
+from tcxgen.track import DEFAULT_ROUTE, concat_tracks, route_template, track_chunks
+
+KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2">
+  <Document>
+    <Placemark><name>Start</name><Point><coordinates>121.5,39.6,0</coordinates></Point></Placemark>
+    <Placemark>
+      <LineString><coordinates>121.80,39.08,96 121.81,39.08,96</coordinates></LineString>
+    </Placemark>
+    <Placemark>
+      <Polygon><outerBoundaryIs><LinearRing>
+        <coordinates>121.0,39.0 121.1,39.0 121.1,39.1 121.0,39.0</coordinates>
+      </LinearRing></outerBoundaryIs></Polygon>
+    </Placemark>
+    <Placemark><gx:Track><gx:coord>121.82 39.08 97</gx:coord></gx:Track></Placemark>
+  </Document>
+</kml>
+"""
+
+
+def test_kml_reads_only_lines(tmp_path):
+    path = tmp_path / "route.kml"
+    path.write_text(KML)
+    points = load_route(str(path))
+    assert points.tolist() == [[39.08, 121.80, 96.0], [39.08, 121.81, 96.0], [39.08, 121.82, 97.0]]
+
+
+def test_geojson_skips_null_geometry(tmp_path):
+    path = tmp_path / "route.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": None, "properties": {}},
+        {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[121.80, 39.08], [121.81, 39.08]]}},
+    ]}))
+    assert load_route(str(path)).tolist() == [[39.08, 121.80, 0.0], [39.08, 121.81, 0.0]]
+
+
+def test_closed_route_is_unchanged():
+    template = route_template(DEFAULT_ROUTE, len(DEFAULT_ROUTE))
+    assert not template.out_and_back
+    assert template.lap_length == template.arc_length[-1]
+
+
+def test_open_route_runs_out_and_back():
+    points = [(39.0, 121.0, 0.0), (39.002, 121.0, 0.0), (39.002, 121.003, 0.0)]
+    template = route_template(points, len(points))
+    assert template.out_and_back
+    assert np.isclose(template.lap_length, 2 * template.arc_length[-1])
+
+    track = concat_tracks(track_chunks(points, datetime(2024, 5, 1), 3000, 9000, interval=1.0))
+    seconds = np.diff(track.time.astype(np.int64)) / 1e6
+    assert (segment_lengths(track.lat, track.lon) / seconds).max() < 3.1
+
+
+def brute_force_distances(index, lat, lon):
+    # 对全部线段求点到线段的距离
+    px, py = index.frame.to_enu(lat, lon)
+    dx, dy = index.bx - index.ax, index.by - index.ay
+    length2 = np.maximum(dx * dx + dy * dy, 1e-300)
+    t = np.clip(((px - index.ax) * dx + (py - index.ay) * dy) / length2, 0.0, 1.0)
+    return np.hypot(px - index.ax - t * dx, py - index.ay - t * dy)
+
+
+def test_segment_index_matches_brute_force():
+    rng = np.random.default_rng(3)
+    n = 12000
+    step = rng.normal(0, 1e-4, (n, 2))
+    step[rng.random(n) < 0.01] *= 30  # 少量跨越很多网格的长线段
+    points = np.column_stack((39.08 + np.cumsum(step[:, 0]), 121.8 + np.cumsum(step[:, 1]), np.zeros(n)))
+    index = SegmentIndex(points)
+    assert len(index) == n - 1
+
+    lat0, lat1 = points[:, 0].min() - 0.01, points[:, 0].max() + 0.01
+    lon0, lon1 = points[:, 1].min() - 0.01, points[:, 1].max() + 0.01
+    queries = np.column_stack((rng.uniform(lat0, lat1, 100), rng.uniform(lon0, lon1, 100)))
+    queries = np.concatenate((queries, points[::400, :2] + rng.normal(0, 2e-5, (30, 2))))
+    for lat, lon in queries:
+        segment, distance, t = index.nearest(lat, lon)
+        distances = brute_force_distances(index, lat, lon)
+        # 距离相同的线段（例如共用端点）都算对，只比较距离
+        assert distance == pytest.approx(distances.min(), abs=1e-6)
+        assert distances[segment] == pytest.approx(distance, abs=1e-6)
+        assert 0.0 <= t <= 1.0
+
+
+def test_segment_index_registers_only_crossed_cells():
+    # 斜穿 10 公里的一条线段只登记它经过的网格，而不是包围盒里的 4 万个
+    index = SegmentIndex([(39.0, 121.0, 0.0), (39.09, 121.12, 0.0)], cell_size=50.0)
+    assert len(index.cells) < 500
+    segment, distance, t = index.nearest(39.045, 121.06)
+    assert segment == 0 and distance < 1.0 and t == pytest.approx(0.5, abs=1e-3)
@@ -0,0 +1,74 @@
+import io
+import xml.etree.ElementTree as ET
+from datetime import timedelta
+from xml.dom import minidom
+
+import pytest
+
+from tcxgen.tcxwriter import TCD_ATTRIB, TIME_FORMAT, TPX_ATTRIB, TCXWriter
+
+def _text(parent, tag, text, attrib=None):
+    elem = ET.SubElement(parent, tag, attrib or {})
+    elem.text = str(text)
+    return elem
+
+
+def minidom_reference(track, lap, start, indent="   ", newl="\n"):
+    # 按原来的做法用 ElementTree 建树再交给 minidom 排版
+    root = ET.Element("TrainingCenterDatabase", TCD_ATTRIB)
+    activity = ET.SubElement(ET.SubElement(root, "Activities"), "Activity", {"Sport": "Running"})
+    _text(activity, "Id", start.strftime(TIME_FORMAT))
+    lap_elem = ET.SubElement(activity, "Lap", {"StartTime": start.strftime(TIME_FORMAT)})
+    _text(lap_elem, "TotalTimeSeconds", lap["total_time"])
+    _text(lap_elem, "DistanceMeters", lap["distance"])
+    _text(lap_elem, "Calories", lap["calories"])
+    _text(lap_elem, "Intensity", "Active")
+    _text(lap_elem, "TriggerMethod", "Manual")
+    track_elem = ET.SubElement(lap_elem, "Track")
+    for i in range(len(track)):
+        point = ET.SubElement(track_elem, "Trackpoint")
+        _text(point, "Time", (start + timedelta(seconds=i * 2.056)).strftime(TIME_FORMAT))
+        position = ET.SubElement(point, "Position")
+        _text(position, "LatitudeDegrees", track.lat[i].item())
+        _text(position, "LongitudeDegrees", track.lon[i].item())
+        _text(point, "AltitudeMeters", track.alt[i].item())
+        _text(point, "DistanceMeters", track.distance[i].item())
+        if track.heart_rate is not None:
+            _text(ET.SubElement(point, "HeartRateBpm"), "Value", track.heart_rate[i].item())
+            _text(point, "Cadence", track.cadence[i].item())
+            tpx = ET.SubElement(ET.SubElement(point, "Extensions"), "TPX", TPX_ATTRIB)
+            _text(tpx, "Speed", track.speed[i].item())
+            _text(tpx, "RunCadence", track.cadence[i].item())
+    tpx = ET.SubElement(ET.SubElement(lap_elem, "Extensions"), "TPX", TPX_ATTRIB)
+    _text(tpx, "Speed", lap["speed"])
+    document = minidom.parseString(ET.tostring(root))
+    if indent == "" and newl == "":
+        return document.toxml()
+    return document.toprettyxml(indent=indent, newl=newl)
+
+
+def stream(track, lap, start, indent="   ", newl="\n"):
+    f = io.StringIO()
+    writer = TCXWriter(f, indent=indent, newl=newl)
+    writer.start_activity(start)
+    writer.start_lap(start, lap["total_time"], lap["distance"], lap["calories"], lap["speed"])
+    writer.track(track)
+    writer.end_lap()
+    writer.end_activity()
+    return f.getvalue()
+
+
+LAP = {"total_time": 1579.0, "distance": 3020.1234567, "calories": 302, "speed": 3020.1234567 / 1579.0}
+
+
+@pytest.mark.parametrize("sensors", [False, True])
+@pytest.mark.parametrize("indent, newl", [("   ", "\n"), ("\t", "\n"), ("", "")])
+def test_matches_minidom(make_track, start_time, sensors, indent, newl):
+    track = make_track(50, sensors=sensors, interval=2.056)
+    assert stream(track, LAP, start_time, indent, newl) == minidom_reference(track, LAP, start_time, indent, newl)
+
+
+def test_escapes_like_minidom(make_track, start_time):
+    lap = dict(LAP, calories="<&\">")
+    track = make_track(3, interval=2.056)
+    assert stream(track, lap, start_time) == minidom_reference(track, lap, start_time)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from tcxgen.geodesy import haversine, segment_lengths
+from tcxgen.api import render
+from tcxgen.signals import PositionNoise, SensorModel
+from tcxgen.track import DEFAULT_ROUTE, concat_tracks, track_chunks
+
+
+def chunks(start, total_time, total_distance, interval, chunk_size, speed=None):
+    return list(track_chunks(DEFAULT_ROUTE, start, total_time, total_distance, speed=speed, interval=interval,
+                             chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize("total_time, total_distance", [(1579.3, 3020.0), (1579.3, 9000.0), (3000, 2500.5),
+                                                        (1579, 3020.0)])
+@pytest.mark.parametrize("interval", [1.0, 2.056])
+def test_whole_second_timestamps_are_unique(total_time, total_distance, interval, start_time):
+    tracks = [concat_tracks(chunks(start_time, total_time, total_distance, interval, size))
+              for size in (1, 7, 4096)]
+    for track in tracks:
+        seconds = track.time.astype("datetime64[s]").astype(np.int64)
+        assert np.diff(seconds).min() >= 1
+        assert track.distance[-1] == pytest.approx(total_distance)
+    # 结果与分块方式无关
+    for track in tracks[1:]:
+        np.testing.assert_array_equal(track.time, tracks[0].time)
+        np.testing.assert_allclose(track.distance, tracks[0].distance)
+
+
+def test_ends_on_total_time(start_time):
+    track = concat_tracks(chunks(start_time, 1579.3, None, 1.0, 100, speed=3.0))
+    assert (track.time[-1] - track.time[0]) / np.timedelta64(1, "s") == pytest.approx(1579.3)
+
+
+def test_position_noise_is_smooth_and_chunk_independent(start_time):
+    whole = concat_tracks(chunks(start_time, 3000, 9000.0, 1.0, 4096))
+    noisy = []
+    for size in (13, 4096):
+        noise = PositionNoise(np.random.default_rng(5), 1.0)
+        noisy.append(concat_tracks(noise.apply(c) for c in chunks(start_time, 3000, 9000.0, 1.0, size)))
+    np.testing.assert_allclose(noisy[0].lat, noisy[1].lat, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(noisy[0].lon, noisy[1].lon, rtol=0, atol=1e-12)
+
+    seconds = np.diff(whole.time.astype(np.int64)) / 1e6
+    speed = segment_lengths(noisy[0].lat, noisy[0].lon) / seconds
+    assert speed.max() < 8.0
+    error = haversine(whole.lat, whole.lon, noisy[0].lat, noisy[0].lon)
+    assert 1.0 < error.mean() < 8.0
+
+
+def test_sensor_model_is_chunk_independent(start_time):
+    tracks = []
+    for size in (1, 13, 4096):
+        model = SensorModel(np.random.default_rng(7), interval=1.0)
+        tracks.append(concat_tracks(model.apply(c) for c in chunks(start_time, 1500, 4000.0, 1.0, size)))
+    for track in tracks[1:]:
+        np.testing.assert_array_equal(track.heart_rate, tracks[0].heart_rate)
+        np.testing.assert_array_equal(track.cadence, tracks[0].cadence)
+        # 分块累加距离的舍入误差只在最后几位
+        np.testing.assert_allclose(track.speed, tracks[0].speed, rtol=1e-9)
+
+
+def test_render_does_not_consume_the_seed(start_time):
+    seed = np.random.SeedSequence(42)
+    first = render(start_time, 3020, 1579, seed=seed, sensors=True, interval=1.0)
+    assert render(start_time, 3020, 1579, seed=seed, sensors=True, interval=1.0) == first
+    default = render(start_time, 3020, 1579, seed=seed, sensors=True)
+    assert render(start_time, 3020, 1579, seed=seed, sensors=True) == default
@@ -0,0 +1,76 @@
+import gzip
+
+import pytest
+
+from tcxgen.api import render
+from tcxgen.validate import summarize, validate_file, validate_paths
+
+
+def write(tmp_path, text, name="a.tcx"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.fixture
+def activity(start_time):
+    # 生成器自己的输出，每 10 秒一个点
+    return render(start_time, 600, 300, seed=1, interval=10.0).decode()
+
+
+def test_generator_output_is_clean(tmp_path, activity):
+    result = validate_file(write(tmp_path, activity))
+    assert result["problems"] == {} and result["points"] == 31 and result["laps"] == 1
+
+
+def test_structure_order(tmp_path, activity):
+    # Calories 必须在 MaximumSpeed 之后、Intensity 之前
+    text = activity.replace("<Calories>60</Calories>", "")
+    text = text.replace("<TotalTimeSeconds>", "<Calories>60</Calories><TotalTimeSeconds>", 1)
+    problems = validate_file(write(tmp_path, text))["problems"]
+    assert list(problems) == ["structure"]
+    assert "顺序" in problems["structure"]["first"]
+
+
+def test_structure_enum_and_missing_child(tmp_path, activity):
+    text = activity.replace("<TriggerMethod>Manual</TriggerMethod>", "<TriggerMethod>Auto</TriggerMethod>")
+    text = text.replace("<Intensity>Active</Intensity>", "")
+    problems = validate_file(write(tmp_path, text))["problems"]
+    assert problems["structure"]["count"] == 2
+
+
+def test_time_repeat(tmp_path, activity):
+    text = activity.replace("10:03:42Z", "10:03:32Z")
+    problems = validate_file(write(tmp_path, text))["problems"]
+    assert problems["time_repeat"]["count"] == 1 and "第 1 个点" in problems["time_repeat"]["first"]
+
+
+def test_lap_totals_mismatch(tmp_path, activity):
+    text = activity.replace("<TotalTimeSeconds>300.0</TotalTimeSeconds>", "<TotalTimeSeconds>250.0</TotalTimeSeconds>")
+    text = text.replace("<DistanceMeters>600.0</DistanceMeters>", "<DistanceMeters>700.0</DistanceMeters>", 1)
+    problems = validate_file(write(tmp_path, text))["problems"]
+    assert set(problems) == {"lap_time", "lap_distance"}
+    assert "250.0" in problems["lap_time"]["first"] and "700.0" in problems["lap_distance"]["first"]
+
+
+def test_corrupt_input_is_reported_per_file(tmp_path, activity):
+    data = gzip.compress(activity.encode())
+    (tmp_path / "good.tcx.gz").write_bytes(data)
+    (tmp_path / "truncated.tcx.gz").write_bytes(data[:100])
+    (tmp_path / "garbage.tcx.gz").write_bytes(b"\x1f\x8b\x08\x00" + b"\x00" * 50)
+    write(tmp_path, activity[:len(activity) // 2], "half.tcx")
+
+    results = validate_paths([str(tmp_path)], "*.tcx*", workers=1)
+    problems = {r["path"].rpartition("/")[2]: r["problems"] for r in results}
+    assert problems["good.tcx.gz"] == {}
+    for name in ("truncated.tcx.gz", "garbage.tcx.gz", "half.tcx"):
+        assert list(problems[name]) == ["parse"]
+    assert summarize(results)["failed"] == 3
+
+
+def test_xsd_syntax_error_is_a_problem(tmp_path):
+    pytest.importorskip("lxml")
+    xsd = write(tmp_path, '<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">'
+                          '<xs:element name="a"/></xs:schema>', "schema.xsd")
+    result = validate_file(write(tmp_path, "<a><b></a>"), xsd=xsd)
+    assert set(result["problems"]) == {"parse", "xsd"}